@@ -0,0 +1,81 @@
+# app_common.py
+import os
+
+import streamlit as st
+
+from asr_whisper import load_whisper_model, speech_to_text
+from audio_buffer import AudioBuffer, audio_stats
+from inference_opt import is_enabled, warmup
+from result_cache import ResultCache
+from translate_nllb import NLLBTranslator
+from tts_coqui import text_to_speech_buffer
+
+# Share finished results across browser sessions (bounded LRU per process)
+SHARE_RESULTS_ACROSS_SESSIONS = os.environ.get("SHARE_RESULTS_ACROSS_SESSIONS") == "1"
+
+# Run ASR, MT and TTS in stage_server worker pools instead of the app process;
+# S2S_STAGE_REPLICAS sets the asr,mt,tts replica counts (default 1,1,1)
+USE_STAGE_SERVER = os.environ.get("S2S_STAGE_SERVER") == "1"
+
+
+@st.cache_resource(show_spinner=False)
+def get_translator():
+    """One NLLB model per server process; the target language is per call"""
+    translator = NLLBTranslator()
+    if is_enabled():
+        # Build the compiled shapes now rather than on the first request
+        warmup(translator, load_whisper_model("tiny"))
+    return translator
+
+
+@st.cache_resource(show_spinner=False)
+def shared_result_cache():
+    return ResultCache(max_entries=256, max_bytes=128 * 1024 * 1024)
+
+
+def result_caches():
+    """Session cache first, then the optional cross-session cache"""
+    if "result_cache" not in st.session_state:
+        st.session_state.result_cache = ResultCache()
+    caches = [st.session_state.result_cache]
+    if SHARE_RESULTS_ACROSS_SESSIONS:
+        caches.append(shared_result_cache())
+    return caches
+
+
+def transcribe_bytes(audio_bytes, copy_stats):
+    # Decode in memory: no temp file, no ffmpeg round trip for WAV
+    with audio_stats(copy_stats):
+        return speech_to_text(AudioBuffer.from_bytes(audio_bytes))
+
+
+def synthesize_bytes(text, copy_stats):
+    """(encoded bytes, format): encoded once, reused by player and download"""
+    with audio_stats(copy_stats):
+        audio = text_to_speech_buffer(text)
+        return audio.encode(), audio.format
+
+
+@st.cache_resource(show_spinner=False)
+def get_stage_server():
+    """One StageServer per app process, shared by every session"""
+    from stage_server import STAGES, StageServer
+    replicas = os.environ.get("S2S_STAGE_REPLICAS", "1,1,1").split(",")
+    return StageServer(dict(zip(STAGES, (int(n) for n in replicas)))).start()
+
+
+def serve_bytes(audio_bytes, target_lang, copy_stats):
+    """(source text, translation, (encoded bytes, format)) from the stage server"""
+    with audio_stats(copy_stats):
+        samples = AudioBuffer.from_bytes(audio_bytes).samples
+        result = get_stage_server().submit(samples, target_lang).result()
+        shared = result["audio"]
+        try:
+            if shared.format == "pcm_f32":
+                audio = AudioBuffer.from_samples(shared.array, shared.sample_rate)
+                encoded = audio.encode(), audio.format
+            else:
+                encoded = shared.tobytes(), shared.format
+        finally:
+            shared.release()
+    return result["text"], result["translation"], encoded
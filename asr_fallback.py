@@ -0,0 +1,251 @@
+# asr_fallback.py
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+
+
+class Cancelled(Exception):
+    """Raised by an engine that noticed its cancel Event"""
+
+
+class ASROutcome:
+    """Result of an ASR race: the text, which engine produced it and why"""
+
+    def __init__(self, text, engine, reason, elapsed, attempts):
+        self.text = text
+        self.engine = engine
+        self.reason = reason
+        self.elapsed = elapsed
+        self.attempts = attempts  # list of (engine, status, seconds)
+
+    def __repr__(self):
+        return (f"ASROutcome(engine={self.engine!r}, reason={self.reason!r}, "
+                f"elapsed={self.elapsed:.2f}s, text={self.text!r})")
+
+
+class FallbackPolicy:
+    """Per-engine timeouts, an overall deadline and optional hedging.
+
+    With hedging on, the next engine is started as soon as the primary has
+    been running longer than its observed latency quantile (p95 by default),
+    and the first acceptable transcript wins.
+    """
+
+    def __init__(self, engine_timeouts=None, default_timeout=30.0, deadline=60.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_samples=5,
+                 hedge_default_delay=None, history_size=200):
+        self.engine_timeouts = dict(engine_timeouts or {})
+        self.default_timeout = default_timeout
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay = hedge_default_delay
+        self.history_size = history_size
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, engine):
+        return self.engine_timeouts.get(engine, self.default_timeout)
+
+    def record_latency(self, engine, seconds):
+        with self._lock:
+            history = self.latencies.setdefault(engine, deque(maxlen=self.history_size))
+            history.append(seconds)
+
+    def latency_quantile(self, engine, q=None):
+        """Observed latency quantile for an engine, or None without history"""
+        q = self.hedge_quantile if q is None else q
+        with self._lock:
+            samples = sorted(self.latencies.get(engine, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(q * len(samples)))
+        return samples[index]
+
+    def hedge_delay(self, engine):
+        """Seconds to wait on `engine` before starting the next one, or None"""
+        if not self.hedge:
+            return None
+        with self._lock:
+            count = len(self.latencies.get(engine, ()))
+        if count < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return self.latency_quantile(engine)
+
+    def is_acceptable(self, text):
+        return bool(text and text.strip())
+
+
+class LocalRecognizer:
+    """Offline stand-in for a network recognizer.
+
+    Returns `text` after `delay` seconds, raises if `fail` is set and with
+    `hang` set blocks until cancelled, so timeouts, hedging and
+    cancellation can be exercised without network access or models.
+    """
+
+    def __init__(self, text="", delay=0.0, fail=False, hang=False):
+        self.text = text
+        self.delay = delay
+        self.fail = fail
+        self.hang = hang
+        self.calls = 0
+
+    def __call__(self, audio_path, cancel=None):
+        self.calls += 1
+        cancel = cancel or threading.Event()
+        if self.hang:
+            cancel.wait()
+            raise Cancelled()
+        if cancel.wait(self.delay):
+            raise Cancelled()
+        if self.fail:
+            raise RuntimeError("local recognizer failure")
+        return self.text
+
+
+def race_asr(audio_path, engines, policy):
+    """Run `engines` ((name, fn) pairs, in priority order) under `policy`.
+
+    Each engine is called as fn(audio_path, cancel) in its own thread.
+    Losers, timed-out engines and everything still running at the deadline
+    get their `cancel` Event set; engines check it between steps and raise
+    Cancelled (or return) so their threads end instead of piling up.
+    Returns the ASROutcome for this call.
+    """
+    engines = list(engines)
+    results = queue.Queue()
+    start = time.monotonic()
+    deadline_at = start + policy.deadline
+    running = {}       # engine -> start time
+    cancels = {}       # engine -> cancel Event
+    launch_reason = {}
+    attempts = []
+    next_index = 0
+    hedge_at = None
+    last_failure = None
+
+    def launch(reason):
+        nonlocal next_index
+        name, fn = engines[next_index]
+        next_index += 1
+        started = time.monotonic()
+        running[name] = started
+        launch_reason[name] = reason
+        cancel = cancels[name] = threading.Event()
+
+        def run():
+            try:
+                text = fn(audio_path, cancel)
+                results.put((name, text, None, time.monotonic() - started))
+            except Exception as e:
+                results.put((name, None, e, time.monotonic() - started))
+
+        # Threads start with an empty context; carry over the caller's
+        # (e.g. its audio_stats() scope) so engine allocations are counted
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"asr-{name}", daemon=True).start()
+
+    def finish(text, engine, reason):
+        for name, started in running.items():
+            cancels[name].set()
+            elapsed = time.monotonic() - started
+            # Censored: the engine would have taken at least this long. Leaving
+            # these out keeps only the fast runs and drags the p95 down.
+            policy.record_latency(name, elapsed)
+            attempts.append((name, "cancelled", elapsed))
+        running.clear()
+        outcome = ASROutcome(text, engine, reason, time.monotonic() - start, attempts)
+        print(f"ASR result from {engine or 'no engine'}: {reason}")
+        return outcome
+
+    if not engines:
+        return finish("", None, "no engines configured")
+
+    launch("primary")
+    delay = policy.hedge_delay(engines[0][0])
+    if delay is not None and len(engines) > 1:
+        hedge_at = start + delay
+        if len(policy.latencies.get(engines[0][0], ())) >= policy.hedge_min_samples:
+            hedge_label = f"p{int(policy.hedge_quantile * 100)} latency"
+        else:
+            hedge_label = "default hedge delay"
+
+    while True:
+        now = time.monotonic()
+        if now >= deadline_at:
+            return finish("", None, f"overall deadline of {policy.deadline:.1f}s exceeded")
+
+        # Expire engines that overran their own timeout
+        for name, started in list(running.items()):
+            timeout = policy.timeout_for(name)
+            if now - started >= timeout:
+                del running[name]
+                cancels[name].set()
+                policy.record_latency(name, timeout)
+                attempts.append((name, "timed out", timeout))
+                last_failure = f"{name} timed out after {timeout:.1f}s"
+                print(f"ASR engine {last_failure}")
+
+        # Hedge: the primary is slower than usual, start the next engine too
+        if hedge_at is not None and now >= hedge_at:
+            hedge_at = None
+            primary = engines[0][0]
+            if primary in running and next_index < len(engines):
+                waited = now - running[primary]
+                launch(f"hedged after {primary} exceeded its {hedge_label} ({waited:.2f}s)")
+
+        if not running:
+            if next_index >= len(engines):
+                return finish("", None, f"all engines failed (last: {last_failure})")
+            launch(f"fallback after {last_failure}")
+
+        wakeups = [deadline_at]
+        if hedge_at is not None:
+            wakeups.append(hedge_at)
+        wakeups.extend(started + policy.timeout_for(name) for name, started in running.items())
+        try:
+            name, text, error, elapsed = results.get(timeout=max(0.0, min(wakeups) - time.monotonic()))
+        except queue.Empty:
+            continue
+
+        if name not in running:
+            continue  # late answer from an engine that was already given up on
+        del running[name]
+
+        if error is not None:
+            attempts.append((name, f"failed: {error}", elapsed))
+            last_failure = f"{name} failed: {error}"
+            print(f"ASR engine {last_failure}")
+            continue
+
+        policy.record_latency(name, elapsed)
+        if not policy.is_acceptable(text):
+            attempts.append((name, "empty result", elapsed))
+            last_failure = f"{name} returned no text"
+            continue
+
+        attempts.append((name, "won", elapsed))
+        return finish(text, name, f"{launch_reason[name]}; answered in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    # Stuck primary, hedged secondary, offline tertiary
+    policy = FallbackPolicy(
+        engine_timeouts={"whisper": 2.0, "network": 1.0, "sphinx": 3.0},
+        deadline=5.0,
+        hedge=True,
+        hedge_default_delay=0.5,
+    )
+    engines = [
+        ("whisper", LocalRecognizer(hang=True)),
+        ("network", LocalRecognizer(text="hello world", delay=0.2)),
+        ("sphinx", LocalRecognizer(text="hello word", delay=0.1)),
+    ]
+    outcome = race_asr("sample.wav", engines, policy)
+    print(outcome)
+    for engine, status, seconds in outcome.attempts:
+        print(f"  {engine}: {status} ({seconds:.2f}s)")
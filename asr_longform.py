@@ -0,0 +1,200 @@
+# asr_longform.py
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+
+from audio_buffer import WHISPER_RATE as SAMPLE_RATE  # 16 kHz
+
+# whisper and torch are imported where they are used, so the chunk
+# planning and stitching logic loads (and is testable) without them.
+
+# 28s of new audio plus 1s of overlap on each side fills exactly one
+# 30s Whisper window, so each chunk is a single encoder/decoder pass.
+CHUNK_SECONDS = 28.0
+OVERLAP_SECONDS = 1.0
+SEARCH_SECONDS = 4.0
+FRAME_SECONDS = 0.03
+
+
+def find_split_points(audio, chunk_seconds=CHUNK_SECONDS, search_seconds=SEARCH_SECONDS,
+                      frame_seconds=FRAME_SECONDS):
+    """Sample offsets to cut at: the quietest frame before each chunk boundary"""
+    frame = max(1, int(frame_seconds * SAMPLE_RATE))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    energy = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+
+    splits = []
+    last = 0
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    search = int(search_seconds * SAMPLE_RATE)
+    while len(audio) - last > chunk:
+        hi = (last + chunk) // frame
+        lo = max(last // frame + 1, (last + chunk - search) // frame)
+        quietest = lo + int(np.argmin(energy[lo:hi])) if hi > lo else hi
+        split = quietest * frame + frame // 2
+        splits.append(split)
+        last = split
+    return splits
+
+
+def plan_chunks(audio, chunk_seconds=CHUNK_SECONDS, overlap_seconds=OVERLAP_SECONDS):
+    """(core_start, core_end, start, end) sample ranges, overlapping by `overlap_seconds`"""
+    bounds = [0] + find_split_points(audio, chunk_seconds) + [len(audio)]
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    chunks = []
+    for core_start, core_end in zip(bounds[:-1], bounds[1:]):
+        start = max(0, core_start - overlap)
+        end = min(len(audio), core_end + overlap)
+        chunks.append((core_start, core_end, start, end))
+    return chunks
+
+
+def stitch_segments(chunk_results):
+    """Merge per-chunk segments, keeping each overlap word exactly once.
+
+    `chunk_results` is a list of (core_start, core_end, segments) with times
+    in seconds on the full recording and per-word timestamps in
+    seg["words"]. Segments straddle the overlap, so ownership is decided
+    per word: a word belongs to the chunk whose core range contains its
+    midpoint. The first chunk's range is open below and the last one's
+    above, so words Whisper places past the end of the audio are kept.
+    Segments are rebuilt from the words they keep.
+    """
+    merged = []
+    last = len(chunk_results) - 1
+    for i, (core_start, core_end, segments) in enumerate(chunk_results):
+        lo = core_start / SAMPLE_RATE if i > 0 else float("-inf")
+        hi = core_end / SAMPLE_RATE if i < last else float("inf")
+        for seg in segments:
+            words = [w for w in seg["words"] if lo <= (w["start"] + w["end"]) / 2 < hi]
+            if words:
+                merged.append({
+                    "start": words[0]["start"],
+                    "end": words[-1]["end"],
+                    "text": "".join(w["word"] for w in words).strip(),
+                    "words": words,
+                })
+    merged.sort(key=lambda s: s["start"])
+    return merged
+
+
+# Worker state: one warm Whisper model per pool process
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads)
+    from asr_whisper import load_whisper_model
+    _worker_model = load_whisper_model(model_name, device="cpu")
+
+
+def _transcribe_chunk(job):
+    from inference_opt import inference_context
+    index, start, samples, language = job
+    with inference_context(autocast=False):
+        result = _worker_model.transcribe(
+            samples,
+            fp16=False,
+            language=language,
+            task="transcribe",
+            condition_on_previous_text=False,  # chunks are independent
+            word_timestamps=True,  # overlap is deduplicated per word
+            verbose=None,
+        )
+    offset = start / SAMPLE_RATE
+    segments = [
+        {
+            "start": seg["start"] + offset,
+            "end": seg["end"] + offset,
+            "text": seg["text"].strip(),
+            "words": [
+                {"word": w["word"], "start": w["start"] + offset, "end": w["end"] + offset}
+                for w in seg.get("words", [])
+            ],
+        }
+        for seg in result["segments"]
+    ]
+    return index, segments
+
+
+class LongFormTranscriber:
+    """Transcribe long recordings on a pool of warm Whisper worker processes.
+
+    The pool is started once and reused, so model loading is paid per worker
+    rather than per file. Each worker gets cpu_count // workers torch threads
+    so the processes do not oversubscribe the cores.
+    """
+
+    def __init__(self, workers=None, model_name="tiny", chunk_seconds=CHUNK_SECONDS,
+                 overlap_seconds=OVERLAP_SECONDS):
+        cores = os.cpu_count() or 1
+        self.workers = workers or cores
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        threads = max(1, cores // self.workers)
+        print(f"Starting {self.workers} Whisper workers ({threads} threads each)...")
+        ctx = mp.get_context("spawn")
+        self.pool = ctx.Pool(self.workers, initializer=_init_worker,
+                             initargs=(model_name, threads))
+
+    def transcribe(self, audio, language="en"):
+        """Transcribe a path or 16 kHz float32 array; returns (text, segments)"""
+        if isinstance(audio, str):
+            import whisper
+            audio = whisper.load_audio(audio)
+        chunks = plan_chunks(audio, self.chunk_seconds, self.overlap_seconds)
+        print(f"Audio: {len(audio) / SAMPLE_RATE:.1f}s in {len(chunks)} chunks")
+
+        jobs = [(i, start, audio[start:end], language)
+                for i, (_, _, start, end) in enumerate(chunks)]
+        results = [None] * len(chunks)
+        for index, segments in self.pool.imap_unordered(_transcribe_chunk, jobs):
+            results[index] = segments
+
+        segments = stitch_segments([
+            (core_start, core_end, results[i])
+            for i, (core_start, core_end, _, _) in enumerate(chunks)
+        ])
+        text = " ".join(seg["text"] for seg in segments if seg["text"])
+        return text, segments
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def transcribe_long(audio_path: str, workers: int = None, language: str = "en"):
+    """One-shot long-form transcription; returns the stitched text"""
+    with LongFormTranscriber(workers=workers) as transcriber:
+        text, _ = transcriber.transcribe(audio_path, language=language)
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel long-form Whisper transcription")
+    parser.add_argument("audio", help="Path to a long recording")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--language", default="en")
+    args = parser.parse_args()
+
+    with LongFormTranscriber(workers=args.workers) as transcriber:
+        start_time = time.time()
+        text, segments = transcriber.transcribe(args.audio, language=args.language)
+        elapsed = time.time() - start_time
+
+    for seg in segments:
+        print(f"[{seg['start']:8.2f} → {seg['end']:8.2f}] {seg['text']}")
+    print(f"\nTranscription Time: {elapsed:.2f} seconds ({len(segments)} segments)")
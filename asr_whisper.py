@@ -6,6 +6,10 @@ import subprocess
 import tempfile
 import speech_recognition as sr
 
+from asr_fallback import ASROutcome, Cancelled, FallbackPolicy, race_asr
+from audio_buffer import WHISPER_RATE, AudioBuffer
+from inference_opt import inference_context, optimize_whisper
+
 def convert_to_wav(input_path: str) -> str:
     """Convert audio to WAV format using ffmpeg"""
     try:
@@ -21,44 +25,140 @@ def convert_to_wav(input_path: str) -> str:
         print("FFmpeg not found, using original file")
         return input_path
 
-def fallback_asr(audio_path: str) -> str:
-    """Fallback ASR using speech_recognition library"""
-    try:
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(audio_path) as source:
-            audio_data = recognizer.record(source)
-            
-        # Try Google Speech Recognition
-        try:
-            text = recognizer.recognize_google(audio_data)
-            print(f"Google ASR result: '{text}'")
-            return text
-        except:
-            # Try Sphinx as offline fallback
-            try:
-                text = recognizer.recognize_sphinx(audio_data)
-                print(f"Sphinx ASR result: '{text}'")
-                return text
-            except:
-                return ""
-                
-    except Exception as e:
-        print(f"Fallback ASR error: {e}")
-        return ""
+def _record_audio(audio_path: str):
+    recognizer = sr.Recognizer()
+    if isinstance(audio_path, AudioBuffer):
+        # Hand the samples over as raw PCM rather than through a file
+        return recognizer, sr.AudioData(audio_path.pcm16_bytes(), audio_path.sample_rate, 2)
+    with sr.AudioFile(audio_path) as source:
+        audio_data = recognizer.record(source)
+    return recognizer, audio_data
+
+def _check(cancel):
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+
+def google_asr(audio_path: str, cancel=None) -> str:
+    """Google Speech Recognition (network)"""
+    recognizer, audio_data = _record_audio(audio_path)
+    recognizer.operation_timeout = ASR_POLICY.timeout_for("google")
+    _check(cancel)
+    text = recognizer.recognize_google(audio_data)
+    print(f"Google ASR result: '{text}'")
+    return text
+
+def sphinx_asr(audio_path: str, cancel=None) -> str:
+    """CMU Sphinx (offline)"""
+    recognizer, audio_data = _record_audio(audio_path)
+    _check(cancel)
+    text = recognizer.recognize_sphinx(audio_data)
+    print(f"Sphinx ASR result: '{text}'")
+    return text
 
-def speech_to_text(audio_path: str) -> str:
-    print("Loading Whisper Tiny model...")
+_whisper_models = {}
+
+# Device speech_to_text's Whisper engine runs on; None picks CUDA when available
+WHISPER_DEVICE = None
+
+def load_whisper_model(name: str = "tiny", device: str = None):
+    """Load a Whisper model once per process and reuse it"""
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    key = (name, device)
+    if key not in _whisper_models:
+        print(f"Loading Whisper {name.title()} model...")
+        print(f"Using device: {device}")
+        _whisper_models[key] = optimize_whisper(whisper.load_model(name, device=device))
+    return _whisper_models[key]
+
+def whisper_asr(audio_path: str, cancel=None) -> str:
+    """Whisper Tiny; raises on failure so the policy can fall back"""
+    model = load_whisper_model("tiny", WHISPER_DEVICE)
+    if isinstance(audio_path, AudioBuffer):
+        audio_path = audio_path.resample(WHISPER_RATE).samples
+    _check(cancel)
     
-    # Determine device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"Using device: {device}")
+    print("Starting transcription...")
+    with inference_context(model.device.type, autocast=False):
+        result = model.transcribe(
+            audio_path, 
+            fp16=False,  # Force CPU mode
+            language="en",
+            task="transcribe",
+            verbose=True  # Enable verbose output
+        )
     
-    try:
-        model = whisper.load_model("tiny", device=device)
-    except Exception as e:
-        print(f"Failed to load Whisper: {e}")
-        print("Using fallback ASR...")
-        return fallback_asr(audio_path)
+    text = result["text"].strip()
+    print(f"Raw transcription result: '{text}'")
+    return text
+
+# Engines in priority order; speech_to_text races them under ASR_POLICY
+ASR_ENGINES = [
+    ("whisper", whisper_asr),
+    ("google", google_asr),
+    ("sphinx", sphinx_asr),
+]
+
+ASR_POLICY = FallbackPolicy(
+    engine_timeouts={"whisper": 60.0, "google": 15.0, "sphinx": 30.0},
+    deadline=90.0,
+)
+
+def fallback_asr(audio_path: str) -> str:
+    """Fallback ASR using speech_recognition library"""
+    outcome = race_asr(audio_path, ASR_ENGINES[1:], ASR_POLICY)
+    return outcome.text
+
+def clean_transcript(text: str) -> str:
+    if text:
+        # Remove common filler words and clean up
+        filler_words = ["um", "uh", "like", "you know", "actually", "basically"]
+        for filler in filler_words:
+            text = text.replace(filler, "").strip()
+        
+        # Remove extra spaces and punctuation
+        text = " ".join(text.split())
+        text = text.strip(".,!?;:")
+    return text
+
+def _no_result(reason: str) -> ASROutcome:
+    print(reason)
+    return ASROutcome("", None, reason, 0.0, [])
+
+def _race_and_clean(audio_path, policy: FallbackPolicy) -> ASROutcome:
+    outcome = race_asr(audio_path, ASR_ENGINES, policy)
+    outcome.text = clean_transcript(outcome.text)
+    print(f"Cleaned transcription: '{outcome.text}'")
+    return outcome
+
+def _buffer_to_outcome(audio: AudioBuffer, policy: FallbackPolicy) -> ASROutcome:
+    audio = audio.resample(WHISPER_RATE)
+    print(f"Audio duration: {audio.duration:.2f}s")
+    if audio.duration < 0.1:
+        return _no_result("Audio too short, likely empty")
+    return _race_and_clean(audio, policy)
+
+def speech_to_text(audio_path: str, policy: FallbackPolicy = None) -> str:
+    """Transcribe with Whisper, falling back to Google then Sphinx.
+
+    Engines run under `policy` (ASR_POLICY by default): each has its own
+    timeout, the whole call has a deadline, and with hedging enabled the
+    next engine starts once Whisper runs past its p95 latency. Use
+    `transcribe_with_outcome` to also get the winning engine and reason.
+
+    `audio_path` may also be an AudioBuffer, which is transcribed straight
+    from memory: no temp file, no ffmpeg round trip.
+    """
+    return transcribe_with_outcome(audio_path, policy).text
+
+def transcribe_with_outcome(audio_path: str, policy: FallbackPolicy = None) -> ASROutcome:
+    """Like speech_to_text, but returns this call's ASROutcome"""
+    policy = policy or ASR_POLICY
+    if isinstance(audio_path, AudioBuffer):
+        try:
+            return _buffer_to_outcome(audio_path, policy)
+        except Exception as e:
+            return _no_result(f"ASR Error: {e}")
     
     try:
         # Convert to WAV if needed
@@ -68,57 +168,18 @@ def speech_to_text(audio_path: str) -> str:
         
         # Check if file exists and has content
         if not os.path.exists(audio_path):
-            print(f"Audio file not found: {audio_path}")
-            return fallback_asr(audio_path)
+            return _no_result(f"Audio file not found: {audio_path}")
         
         file_size = os.path.getsize(audio_path)
         print(f"Audio file size: {file_size} bytes")
         
         if file_size < 1000:  # Less than 1KB
-            print("Audio file too small, likely empty")
-            return ""
-        
-        # Try transcription with different parameters
-        print("Starting transcription...")
-        print(f"Audio file path: {audio_path}")
-        print(f"File exists: {os.path.exists(audio_path)}")
-        print(f"File readable: {os.access(audio_path, os.R_OK)}")
-        
-        try:
-            result = model.transcribe(
-                audio_path, 
-                fp16=False,  # Force CPU mode
-                language="en",
-                task="transcribe",
-                verbose=True  # Enable verbose output
-            )
-            
-            text = result["text"].strip()
-            print(f"Raw transcription result: '{text}'")
-            
-        except Exception as whisper_error:
-            print(f"Whisper transcription failed: {whisper_error}")
-            print("Trying fallback ASR...")
-            return fallback_asr(audio_path)
-        
-        # Clean up the result
-        if text:
-            # Remove common filler words and clean up
-            filler_words = ["um", "uh", "like", "you know", "actually", "basically"]
-            for filler in filler_words:
-                text = text.replace(filler, "").strip()
-            
-            # Remove extra spaces and punctuation
-            text = " ".join(text.split())
-            text = text.strip(".,!?;:")
+            return _no_result("Audio file too small, likely empty")
         
-        print(f"Cleaned transcription: '{text}'")
-        return text
+        return _race_and_clean(audio_path, policy)
         
     except Exception as e:
-        print(f"ASR Error: {e}")
-        print("Using fallback ASR...")
-        return fallback_asr(audio_path)
+        return _no_result(f"ASR Error: {e}")
     finally:
         # Cleanup converted file
         if '_converted.wav' in audio_path and os.path.exists(audio_path):
@@ -126,3 +187,84 @@ def speech_to_text(audio_path: str) -> str:
                 os.unlink(audio_path)
             except:
                 pass
+
+# whisper.transcribe()'s defaults for rejecting a greedy decode
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+def speech_to_text_batch(audio_paths, batch_size: int = 16) -> list:
+    """Transcribe many short clips, one Whisper encoder pass per batch.
+    
+    Clips are padded to Whisper's 30s window and stacked into one log-mel
+    batch; whisper.decode runs the encoder once and decodes all clips in
+    parallel, retiring each clip at its own end-of-text and stopping as
+    soon as every clip has finished. Batched decoding is greedy only, so
+    each result gets transcribe()'s quality checks: a clip Whisper
+    judges silent comes back empty, and one that looks repetitive or
+    low-confidence is re-run through speech_to_text (temperature fallback,
+    then the other engines). Results are returned in input order; clips
+    over 30s or that fail to load also go through speech_to_text. Paths
+    and AudioBuffers can be mixed.
+    """
+    audio_paths = list(audio_paths)
+    results = [""] * len(audio_paths)
+    model = load_whisper_model("tiny", WHISPER_DEVICE)
+    options = whisper.DecodingOptions(
+        language="en",
+        task="transcribe",
+        fp16=False,  # Force CPU mode
+        without_timestamps=True
+    )
+    
+    clips = []
+    for index, path in enumerate(audio_paths):
+        try:
+            if isinstance(path, AudioBuffer):
+                audio = path.resample(WHISPER_RATE).samples
+            else:
+                audio = whisper.load_audio(path)
+        except Exception as e:
+            print(f"Could not load {path} for batching ({e}), transcribing alone")
+            results[index] = speech_to_text(path)
+            continue
+        if len(audio) > whisper.audio.N_SAMPLES:
+            results[index] = speech_to_text(path)
+        elif len(audio) >= whisper.audio.SAMPLE_RATE // 10:  # skip near-empty clips
+            clips.append((index, audio))
+    
+    for start in range(0, len(clips), batch_size):
+        batch = clips[start:start + batch_size]
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels)
+            for _, audio in batch
+        ]).to(model.device)
+        print(f"Decoding batch of {len(batch)} clips...")
+        with inference_context(model.device.type, autocast=False):
+            decoded = whisper.decode(model, mel, options)
+        for (index, _), result in zip(batch, decoded):
+            low_confidence = result.avg_logprob < LOGPROB_THRESHOLD
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and low_confidence:
+                continue  # silence: transcribe() would drop it too
+            if result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or low_confidence:
+                print(f"Batch result for clip {index} failed quality checks, re-transcribing")
+                results[index] = speech_to_text(audio_paths[index])
+            else:
+                results[index] = clean_transcript(result.text.strip())
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    
+    parser = argparse.ArgumentParser(description="Transcribe audio clips with Whisper")
+    parser.add_argument("audio", nargs="+", help="Audio files (short clips batch best)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+    
+    start_time = time.time()
+    texts = speech_to_text_batch(args.audio, batch_size=args.batch_size)
+    elapsed = time.time() - start_time
+    for path, text in zip(args.audio, texts):
+        print(f"{path}: {text}")
+    print(f"ASR Time: {elapsed:.2f} seconds for {len(texts)} clips")
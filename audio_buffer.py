@@ -0,0 +1,233 @@
+# audio_buffer.py
+import contextlib
+import contextvars
+import struct
+import subprocess
+
+import numpy as np
+
+WHISPER_RATE = 16000
+
+
+class CopyStats:
+    """Copies and bytes allocated for audio while a request is processed"""
+
+    def __init__(self):
+        self.copies = 0
+        self.bytes_allocated = 0
+        self.events = []  # (what, nbytes)
+
+    def record(self, what, nbytes):
+        self.copies += 1
+        self.bytes_allocated += nbytes
+        self.events.append((what, nbytes))
+
+    def __repr__(self):
+        return f"CopyStats(copies={self.copies}, bytes_allocated={self.bytes_allocated})"
+
+
+_stats = contextvars.ContextVar("audio_copy_stats", default=None)
+
+
+@contextlib.contextmanager
+def audio_stats(stats=None):
+    """Count audio copies made inside the block (per thread/context).
+
+    Pass the same CopyStats to several blocks to total a whole request.
+    """
+    stats = stats if stats is not None else CopyStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+
+
+def _track(what, nbytes):
+    stats = _stats.get()
+    if stats is not None:
+        stats.record(what, nbytes)
+
+
+def _parse_wav(view):
+    """(pcm view, dtype, channels, rate) for a PCM/float WAV, without copying"""
+    if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        return None
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(view):
+        chunk_id = bytes(view[pos:pos + 4])
+        size = int.from_bytes(view[pos + 4:pos + 8], "little")
+        body = view[pos + 8:min(len(view), pos + 8 + size)]
+        if chunk_id == b"fmt ":
+            audio_format, channels, rate = struct.unpack_from("<HHI", body)
+            bits = struct.unpack_from("<H", body, 14)[0]
+            if audio_format == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE: real format in the sub-GUID
+                audio_format = struct.unpack_from("<H", body, 24)[0]
+            fmt = (audio_format, channels, rate, bits)
+        elif chunk_id == b"data" and fmt is not None:
+            audio_format, channels, rate, bits = fmt
+            if (audio_format, bits) == (1, 16):
+                dtype = np.int16
+            elif (audio_format, bits) == (3, 32):
+                dtype = np.float32
+            else:
+                return None
+            frame = channels * np.dtype(dtype).itemsize
+            body = body[:len(body) - len(body) % frame]
+            return np.frombuffer(body, dtype=dtype), dtype, channels, rate
+        pos += 8 + size + (size & 1)
+    return None
+
+
+class AudioBuffer:
+    """Mono audio held in one contiguous float32 array.
+
+    Every stage passes the same buffer along: decoding happens once on the
+    way in (WAV is read in place; other formats go through an ffmpeg pipe,
+    no temp files) and encoding once at the edge via `encode()`. Buffers
+    built from already-encoded output (gTTS mp3) keep those bytes and only
+    decode if someone asks for samples. Every allocation of audio data is
+    recorded in the active `audio_stats()` scope.
+    """
+
+    def __init__(self, samples=None, sample_rate=WHISPER_RATE, encoded=None, fmt=None):
+        self._samples = samples
+        self.sample_rate = sample_rate
+        self._encoded = {fmt: encoded} if encoded is not None else {}
+        self.format = fmt or "wav"
+
+    @classmethod
+    def from_samples(cls, samples, sample_rate):
+        """Wrap model output; only copies if it is not already float32"""
+        array = np.asarray(samples)
+        if array.dtype != np.float32 or not array.flags.c_contiguous:
+            array = np.ascontiguousarray(array, dtype=np.float32)
+            _track("from_samples", array.nbytes)
+        return cls(array.reshape(-1), sample_rate)
+
+    @classmethod
+    def from_encoded(cls, data, fmt):
+        """Wrap already-encoded output (e.g. gTTS mp3); decoded only on demand"""
+        _track("encoded", len(data))
+        return cls(sample_rate=None, encoded=data, fmt=fmt)
+
+    @classmethod
+    def from_bytes(cls, data, sample_rate=WHISPER_RATE):
+        """Decode uploaded audio (bytes or a memoryview) to mono float32.
+
+        16-bit or float WAV is read straight out of `data`; the only
+        allocation is the float32 result, and a float32 mono file is not
+        copied at all. Anything else is decoded by ffmpeg over pipes.
+        """
+        view = memoryview(data).cast("B")
+        parsed = _parse_wav(view)
+        if parsed is None:
+            return cls(_ffmpeg_decode(view, sample_rate), sample_rate)
+
+        pcm, dtype, channels, rate = parsed
+        frames = len(pcm) // channels
+        if dtype == np.float32 and channels == 1:
+            return cls(pcm, rate).resample(sample_rate)
+
+        samples = np.empty(frames, dtype=np.float32)
+        _track("decode", samples.nbytes)
+        if channels == 1:
+            np.multiply(pcm, 1 / 32768, out=samples, casting="unsafe")
+        else:
+            pcm.reshape(frames, channels).mean(axis=1, dtype=np.float32, out=samples)
+            if dtype == np.int16:
+                samples *= 1 / 32768
+        return cls(samples, rate).resample(sample_rate)
+
+    @classmethod
+    def from_file(cls, path, sample_rate=WHISPER_RATE):
+        with open(path, "rb") as f:
+            data = f.read()
+        _track("read_file", len(data))
+        return cls.from_bytes(data, sample_rate)
+
+    @property
+    def samples(self):
+        if self._samples is None:
+            encoded = self._encoded[self.format]
+            self._samples = _ffmpeg_decode(memoryview(encoded), WHISPER_RATE)
+            self.sample_rate = WHISPER_RATE
+        return self._samples
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def resample(self, sample_rate):
+        """Return audio at `sample_rate`: this buffer if it already matches.
+
+        Uses torchaudio's windowed-sinc (polyphase) resampler, which
+        low-passes below the new Nyquist frequency first, so content above
+        it (a 10 kHz tone in 44.1 kHz audio going to 16 kHz) is removed
+        rather than folded back into the speech band.
+        """
+        if sample_rate == self.sample_rate:
+            return self
+        import torch
+        import torchaudio.functional as AF
+
+        samples = self.samples
+        if not samples.flags.writeable:
+            # torch.from_numpy needs a writable array (e.g. a view of an upload)
+            samples = samples.copy()
+            _track("resample_input", samples.nbytes)
+        resampled = AF.resample(torch.from_numpy(samples), int(self.sample_rate), int(sample_rate)).numpy()
+        _track("resample", resampled.nbytes)
+        return AudioBuffer(resampled, sample_rate)
+
+    def pcm16(self):
+        """Samples as 16-bit PCM (for recognizers that want raw PCM)"""
+        # Clip a scaled scratch copy: the samples may be a caller's buffer
+        # (a zero-copy upload) that others still read or hash
+        scaled = np.multiply(self.samples, 32767, dtype=np.float32)
+        np.clip(scaled, -32767, 32767, out=scaled)
+        pcm = scaled.astype(np.int16)
+        _track("pcm16_scratch", scaled.nbytes)
+        _track("pcm16", pcm.nbytes)
+        return pcm
+
+    def pcm16_bytes(self):
+        """Raw little-endian 16-bit PCM bytes"""
+        data = self.pcm16().tobytes()
+        _track("pcm16_bytes", len(data))
+        return data
+
+    def encode(self, fmt=None):
+        """Encode for output once; repeated calls return the same bytes"""
+        fmt = fmt or self.format
+        if fmt not in self._encoded:
+            if fmt == "wav":
+                pcm = self.pcm16()
+                header = struct.pack(
+                    "<4sI4s4sIHHIIHH4sI",
+                    b"RIFF", 36 + pcm.nbytes, b"WAVE", b"fmt ", 16, 1, 1,
+                    self.sample_rate, self.sample_rate * 2, 2, 16, b"data", pcm.nbytes,
+                )
+                self._encoded[fmt] = b"".join((header, pcm.data))
+            else:
+                self._encoded[fmt] = _ffmpeg_encode(memoryview(self.encode("wav")), fmt)
+            _track(f"encode_{fmt}", len(self._encoded[fmt]))
+        return self._encoded[fmt]
+
+
+def _ffmpeg_decode(view, sample_rate):
+    result = subprocess.run(
+        ["ffmpeg", "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+        input=view, capture_output=True, check=True,
+    )
+    _track("ffmpeg_decode", len(result.stdout))
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def _ffmpeg_encode(view, fmt):
+    result = subprocess.run(
+        ["ffmpeg", "-f", "wav", "-i", "pipe:0", "-f", fmt, "pipe:1"],
+        input=view, capture_output=True, check=True,
+    )
+    return result.stdout
@@ -0,0 +1,138 @@
+# incremental_translate.py
+import re
+
+# A sentence is committed once terminal punctuation is followed by more text
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+class IncrementalTranslator:
+    """Live-caption translation that only re-decodes the unfinished tail.
+
+    Completed source sentences are translated once and their target tokens
+    committed; every later decode is forced to start with those tokens, so
+    the committed part of the caption never flickers. Only the open tail
+    sentence is re-decoded as the transcript grows.
+
+    `context_sentences` bounds how many committed sentences are fed back as
+    source context (and forced target prefix), which keeps encoder work per
+    update constant instead of growing with the transcript.
+    """
+
+    def __init__(self, translator, target_lang=None, context_sentences=2):
+        self.translator = translator
+        self.target_lang = target_lang or translator.target_lang
+        self.context_sentences = context_sentences
+        self.reset()
+
+    def reset(self):
+        self._clear()
+        self.updates = 0
+        self.redecoded_tokens = 0
+        self.full_tokens = 0
+        self.resets = 0
+
+    def _clear(self):
+        self.committed_source = []  # source sentences
+        self.committed_ids = []     # target token ids, one list per sentence
+        self.tail_source = ""
+        self.tail_ids = []
+        self.unbroken_sentence = None  # index finish() committed without a break
+
+    def _decode(self, sentence):
+        context = max(0, len(self.committed_source) - self.context_sentences)
+        source = " ".join(self.committed_source[context:] + [sentence])
+        prefix = [t for ids in self.committed_ids[context:] for t in ids]
+        new_ids = self.translator.generate_ids(source, self.target_lang, prefix_ids=prefix)
+        self.redecoded_tokens += len(new_ids)
+        return new_ids
+
+    def update(self, source_text: str) -> str:
+        """Feed the whole transcript so far; returns the caption to display"""
+        self.updates += 1
+        parts = SENTENCE_BREAK.split(source_text.strip())
+        complete, tail = parts[:-1], parts[-1]
+
+        # finish() committed the tail before it had its sentence break: the
+        # same transcript, or one that only adds the full stop, still matches
+        unbroken = self.unbroken_sentence
+        if unbroken is not None:
+            if parts == self.committed_source:
+                complete, tail = parts, ""
+            elif (len(complete) > unbroken
+                  and complete[unbroken].rstrip(".!?") == self.committed_source[unbroken]):
+                self.committed_source[unbroken] = complete[unbroken]
+                self.unbroken_sentence = None
+
+        # ASR revised text we already committed: start over
+        if complete[:len(self.committed_source)] != self.committed_source:
+            print("Committed source changed, re-translating from scratch")
+            self._clear()
+            self.resets += 1
+
+        new_sentences = complete[len(self.committed_source):]
+        for i, sentence in enumerate(new_sentences):
+            # The old tail just got its full stop: its decode is already final
+            if i == 0 and sentence == self.tail_source:
+                ids = self.tail_ids
+            else:
+                ids = self._decode(sentence)
+            self.committed_source.append(sentence)
+            self.committed_ids.append(ids)
+
+        if new_sentences or tail != self.tail_source:
+            self.tail_source = tail
+            self.tail_ids = self._decode(tail) if tail else []
+
+        # A from-scratch re-translation would decode every output token again
+        self.full_tokens += sum(len(ids) for ids in self.committed_ids) + len(self.tail_ids)
+        return self.text
+
+    def finish(self) -> str:
+        """Commit the tail (end of utterance) and return the final caption.
+
+        Feeding the same transcript to update() afterwards is a no-op.
+        """
+        if self.tail_source:
+            self.unbroken_sentence = len(self.committed_source)
+            self.committed_source.append(self.tail_source)
+            self.committed_ids.append(self.tail_ids)
+            self.tail_source = ""
+            self.tail_ids = []
+        return self.text
+
+    def _decode_text(self, ids):
+        return self.translator.tokenizer.decode(ids, skip_special_tokens=True)
+
+    @property
+    def committed_text(self) -> str:
+        return self._decode_text([t for ids in self.committed_ids for t in ids])
+
+    @property
+    def text(self) -> str:
+        return self._decode_text([t for ids in self.committed_ids for t in ids] + self.tail_ids)
+
+    def stats(self):
+        saved = 1 - self.redecoded_tokens / self.full_tokens if self.full_tokens else 0.0
+        return {
+            "updates": self.updates,
+            "redecoded_tokens": self.redecoded_tokens,
+            "full_retranslation_tokens": self.full_tokens,
+            "saved": saved,
+            "resets": self.resets,
+        }
+
+
+if __name__ == "__main__":
+    from translate_nllb import NLLBTranslator
+
+    transcript = ("Good morning everyone. Today we will talk about speech translation. "
+                  "It should feel natural and fast.")
+    captions = IncrementalTranslator(NLLBTranslator("fra_Latn"))
+    words = transcript.split()
+    for i in range(1, len(words) + 1):
+        print(f"{' '.join(words[:i])}\n  → {captions.update(' '.join(words[:i]))}")
+    print(f"\nFinal: {captions.finish()}")
+
+    stats = captions.stats()
+    print(f"Re-decoded {stats['redecoded_tokens']} tokens vs {stats['full_retranslation_tokens']} "
+          f"for full re-translation ({stats['saved'] * 100:.1f}% saved over {stats['updates']} updates)")
@@ -0,0 +1,119 @@
+# inference_opt.py
+import contextlib
+import os
+
+import torch
+
+# Opt-in: set S2S_OPTIMIZED=1 (or call enable()) before the models load.
+# S2S_COMPILE=0 keeps inference_mode/autocast but skips torch.compile.
+_enabled = os.environ.get("S2S_OPTIMIZED") == "1"
+_compile = os.environ.get("S2S_COMPILE", "1") == "1"
+
+# Encoder inputs are padded up to one of these lengths, so a compiled
+# encoder sees at most len(SEQ_BUCKETS) shapes (plus multiples of the
+# largest bucket for very long inputs) instead of one per input length.
+SEQ_BUCKETS = (16, 32, 64, 128, 256)
+
+
+def enable(compile: bool = True):
+    global _enabled, _compile
+    _enabled = True
+    _compile = compile
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def bucket_length(n: int) -> int:
+    for bucket in SEQ_BUCKETS:
+        if n <= bucket:
+            return bucket
+    largest = SEQ_BUCKETS[-1]
+    return -(-n // largest) * largest
+
+
+def bf16_supported(device: str = "cpu") -> bool:
+    """True when bf16 matmuls are natively fast (AVX512-BF16/AMX, or CUDA)"""
+    if device == "cuda":
+        return torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+@contextlib.contextmanager
+def inference_context(device: str = "cpu", autocast: bool = True):
+    """inference_mode plus bf16 autocast where the CPU supports it.
+
+    A no-op unless the optimized mode is enabled, so stage code can wrap
+    its model calls unconditionally. Whisper and Coqui callers pass
+    autocast=False: Whisper's decoder rejects the bf16 audio features an
+    autocast encoder returns.
+    """
+    if not _enabled:
+        yield
+        return
+    device_type = "cuda" if str(device).startswith("cuda") else "cpu"
+    with torch.inference_mode():
+        if autocast and bf16_supported(device_type):
+            with torch.autocast(device_type=device_type, dtype=torch.bfloat16):
+                yield
+        else:
+            yield
+
+
+def compile_module(module, dynamic: bool = False):
+    """torch.compile `module` if compiling is on; returns the module to use"""
+    if not (_enabled and _compile) or not hasattr(torch, "compile"):
+        return module
+    return torch.compile(module, dynamic=dynamic)
+
+
+def optimize_translator(translator):
+    """Compile the NLLB encoder (bucketed, static) and decoder (dynamic).
+
+    The encoder only ever sees bucketed lengths; the decoder's KV-cache
+    length grows every step, so it is compiled once with dynamic shapes
+    rather than once per step.
+    """
+    if not _enabled:
+        return translator
+    if _compile:
+        # Padding only pays off when it saves recompiles
+        translator.seq_buckets = SEQ_BUCKETS
+        torch._dynamo.config.cache_size_limit = max(
+            torch._dynamo.config.cache_size_limit, len(SEQ_BUCKETS) + 4
+        )
+        model = translator.model.model
+        model.encoder = compile_module(model.encoder, dynamic=False)
+        model.decoder = compile_module(model.decoder, dynamic=True)
+    return translator
+
+
+def optimize_whisper(model):
+    """Compile the Whisper audio encoder; its input is always 30s of mel.
+
+    The text decoder is left eager: Whisper feeds its KV cache through
+    forward hooks, which do not survive compilation.
+    """
+    if _enabled and _compile:
+        model.encoder = compile_module(model.encoder, dynamic=False)
+    return model
+
+
+def warmup(translator=None, whisper_model=None):
+    """Run each compiled shape once so the first real request is not slow"""
+    if not _enabled:
+        return
+    print("Warming up optimized models...")
+    if whisper_model is not None:
+        import numpy as np
+        with inference_context(whisper_model.device, autocast=False):
+            whisper_model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False, language="en")
+    if translator is not None and translator.seq_buckets:
+        for bucket in SEQ_BUCKETS:
+            # One token per word plus specials lands inside each bucket
+            translator.translate(" ".join(["hello"] * max(1, bucket - 4)))
+    print("Warmup complete")
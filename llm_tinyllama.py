@@ -3,6 +3,8 @@
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
 
+from inference_opt import inference_context
+
 MODEL_NAME = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
 
 tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
@@ -30,12 +32,13 @@ Answer:
 
     inputs = tokenizer(prompt, return_tensors="pt")
 
-    outputs = model.generate(
-        **inputs,
-        max_new_tokens=120,
-        temperature=0.7,
-        do_sample=True
-    )
+    with inference_context(model.device.type):
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=120,
+            temperature=0.7,
+            do_sample=True
+        )
 
     result = tokenizer.decode(outputs[0], skip_special_tokens=True)
 
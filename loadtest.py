@@ -0,0 +1,334 @@
+# loadtest.py
+import argparse
+import os
+import queue
+import random
+import threading
+import time
+
+STAGES = ("ASR", "Translation", "TTS")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (q in 0-100); 0.0 when empty"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class MockPipeline:
+    """Pipeline stand-in with synthetic per-stage delays.
+
+    Each stage sleeps for its mean delay times a uniform (1 ± jitter)
+    factor. With `cores` set, every stage holds one of `cores` slots while
+    it runs, which models a node whose CPU saturates; without it only the
+    harness concurrency limits throughput.
+    """
+
+    def __init__(self, asr_delay=0.5, mt_delay=0.3, tts_delay=0.4, jitter=0.2, cores=None, seed=None):
+        self.delays = {"ASR": asr_delay, "Translation": mt_delay, "TTS": tts_delay}
+        self.jitter = jitter
+        self.slots = threading.BoundedSemaphore(cores) if cores else None
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _sleep(self, stage):
+        with self._random_lock:
+            factor = 1 + self.random.uniform(-self.jitter, self.jitter)
+        delay = max(0.0, self.delays[stage] * factor)
+        if self.slots is None:
+            time.sleep(delay)
+        else:
+            with self.slots:
+                time.sleep(delay)
+
+    def stages(self, audio_path, target_lang):
+        def asr(_):
+            self._sleep("ASR")
+            return "hello world"
+
+        def mt(text):
+            self._sleep("Translation")
+            return f"[{target_lang}] {text}"
+
+        def tts(text):
+            self._sleep("TTS")
+            return None
+
+        return [("ASR", asr), ("Translation", mt), ("TTS", tts)]
+
+
+def _read_upload(audio_path):
+    """The request's audio as the app receives it: bytes, read once"""
+    with open(audio_path, "rb") as f:
+        return f.read()
+
+
+class LocalPipeline:
+    """The process_audio_fast stages with real models, in this process.
+
+    Like the app, audio stays in memory: the upload's bytes are decoded
+    into an AudioBuffer for ASR and TTS output is encoded once, with no
+    temp files.
+    """
+
+    def __init__(self):
+        from translate_nllb import NLLBTranslator
+        self.translator = NLLBTranslator()
+
+    def stages(self, audio_path, target_lang):
+        from asr_whisper import speech_to_text
+        from audio_buffer import AudioBuffer
+        from tts_coqui import text_to_speech_buffer
+
+        def asr(path):
+            return speech_to_text(AudioBuffer.from_bytes(_read_upload(path)))
+
+        def tts(text):
+            audio = text_to_speech_buffer(text)
+            return audio.encode(), audio.format
+
+        return [
+            ("ASR", asr),
+            ("Translation", lambda text: self.translator.translate(text, target_lang)),
+            ("TTS", tts),
+        ]
+
+
+class ServerPipeline:
+    """The same in-memory stages dispatched to a worker_server.InferenceServer.
+
+    `upload` replaces the file's bytes (mock workers ignore the content).
+    """
+
+    def __init__(self, server, upload=None):
+        self.server = server
+        self.upload = upload
+
+    def stages(self, audio_path, target_lang):
+        def asr(path):
+            upload = self.upload if self.upload is not None else _read_upload(path)
+            return self.server.call("asr", audio_bytes=upload)
+
+        return [
+            ("ASR", asr),
+            ("Translation", lambda text: self.server.call("translate", text=text, target_lang=target_lang)),
+            ("TTS", lambda text: self.server.call("tts", text=text)),
+        ]
+
+
+class LoadResult:
+    """Per-request records from one load level plus summary statistics"""
+
+    def __init__(self, rate, concurrency, records, errors, elapsed, arrivals):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.records = records
+        self.errors = errors
+        self.elapsed = elapsed
+        self.arrivals = arrivals  # arrival times, in order
+
+    @staticmethod
+    def _rate(times):
+        """Events per second: 1 / least-squares slope of `times` against their rank.
+
+        Fitting every event rather than dividing by first-to-last keeps one
+        slow first or last request from skewing the rate.
+        """
+        n = len(times)
+        if n < 2:
+            return 0.0
+        mean_rank = (n - 1) / 2
+        mean_time = sum(times) / n
+        cov = sum((i - mean_rank) * (t - mean_time) for i, t in enumerate(times))
+        var = sum((i - mean_rank) ** 2 for i in range(n))
+        return var / cov if cov > 0 else 0.0
+
+    @property
+    def arrival_rate(self):
+        """Realized arrival rate (a Poisson sample drifts from the nominal rate)"""
+        return self._rate(self.arrivals)
+
+    @property
+    def throughput(self):
+        """Completion rate, fitted over the finish times.
+
+        Measured between completions rather than from the first arrival,
+        so the last request's service time (the drain tail) is not counted
+        as lost capacity.
+        """
+        return self._rate(sorted(r["finished"] for r in self.records))
+
+    def latencies(self, key):
+        if key in ("queue", "total"):
+            return [r[key] for r in self.records]
+        return [r["stages"][key] for r in self.records if key in r["stages"]]
+
+    def summary(self):
+        rows = {}
+        for key in ("queue",) + STAGES + ("total",):
+            values = self.latencies(key)
+            rows[key] = {q: percentile(values, q) for q in (50, 95, 99)}
+        return rows
+
+    def print_report(self):
+        print(f"\nOffered rate: {self.rate:.2f} req/s (realized {self.arrival_rate:.2f}) • "
+              f"concurrency {self.concurrency}")
+        print(f"Completed: {len(self.records)} • errors: {len(self.errors)} • "
+              f"throughput: {self.throughput:.2f} req/s")
+        print(f"{'':<13} {'p50':>8} {'p95':>8} {'p99':>8}")
+        labels = {"queue": "Queueing", "total": "End-to-end"}
+        for key, row in self.summary().items():
+            print(f"{labels.get(key, key):<13} {row[50]:>7.2f}s {row[95]:>7.2f}s {row[99]:>7.2f}s")
+
+
+def run_load(pipeline, rate, concurrency, requests=50, audio_path="sample.wav",
+             target_lang="fra_Latn", seed=None):
+    """Drive `requests` Poisson arrivals at `rate` req/s through `concurrency` sessions.
+
+    Queueing delay is the time from arrival until a session picks the
+    request up; stage latencies are measured around each stage call.
+    """
+    arrivals = queue.Queue()
+    records = []
+    errors = []
+    lock = threading.Lock()
+    rng = random.Random(seed)
+
+    def session():
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            request_id, arrived = item
+            started = time.monotonic()
+            stages = {}
+            try:
+                payload = audio_path
+                for name, fn in pipeline.stages(audio_path, target_lang):
+                    stage_start = time.monotonic()
+                    payload = fn(payload)
+                    stages[name] = time.monotonic() - stage_start
+            except Exception as e:
+                with lock:
+                    errors.append((request_id, f"{type(e).__name__}: {e}"))
+                continue
+            finished = time.monotonic()
+            with lock:
+                records.append({
+                    "id": request_id,
+                    "queue": started - arrived,
+                    "stages": stages,
+                    "total": finished - arrived,
+                    "finished": finished,
+                })
+
+    sessions = [threading.Thread(target=session, daemon=True) for _ in range(concurrency)]
+    for thread in sessions:
+        thread.start()
+
+    start = time.monotonic()
+    next_arrival = start
+    arrived_at = []
+    for request_id in range(requests):
+        delay = next_arrival - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        arrived_at.append(time.monotonic())
+        arrivals.put((request_id, arrived_at[-1]))
+        next_arrival += rng.expovariate(rate)
+    for _ in sessions:
+        arrivals.put(None)
+    for thread in sessions:
+        thread.join()
+
+    end = max((r["finished"] for r in records), default=time.monotonic())
+    return LoadResult(rate, concurrency, records, errors, end - start, arrived_at)
+
+
+def find_saturation(pipeline, rates, concurrency, requests=50, efficiency=0.9, slo=None, **kwargs):
+    """Sweep `rates` upwards; return (results, saturating rate or None).
+
+    A level is saturated when throughput falls below `efficiency` × the
+    arrival rate actually realized in that run (not the nominal `rate`,
+    which a 50-request Poisson sample can miss by 15% or more), or when
+    p95 end-to-end latency exceeds `slo` seconds (default: 3× the p95 at
+    the lowest rate).
+    """
+    results = []
+    saturation = None
+    for rate in sorted(rates):
+        result = run_load(pipeline, rate, concurrency, requests, **kwargs)
+        result.print_report()
+        results.append(result)
+        p95 = result.summary()["total"][95]
+        limit = slo if slo is not None else 3 * results[0].summary()["total"][95]
+        if result.throughput < efficiency * result.arrival_rate or p95 > limit:
+            saturation = rate
+            print(f"⚠️  Saturated at {rate:.2f} req/s (throughput {result.throughput:.2f} req/s "
+                  f"vs {result.arrival_rate:.2f} arriving, "
+                  f"p95 {p95:.2f}s vs limit {limit:.2f}s)")
+            break
+    return results, saturation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the speech pipeline")
+    parser.add_argument("--mode", choices=["mock", "local", "server"], default="mock")
+    parser.add_argument("--rates", default="0.5,1,2,4,8", help="Comma-separated arrival rates (req/s)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per rate level")
+    parser.add_argument("--audio", default="sample.wav")
+    parser.add_argument("--target-lang", default="fra_Latn")
+    parser.add_argument("--slo", type=float, default=None, help="p95 end-to-end limit in seconds")
+    parser.add_argument("--workers", type=int, default=2, help="Server mode: forked workers")
+    parser.add_argument("--mock", action="store_true",
+                        help="Server mode: workers sleep for the stage delays instead of loading models")
+    parser.add_argument("--asr-delay", type=float, default=0.5)
+    parser.add_argument("--mt-delay", type=float, default=0.3)
+    parser.add_argument("--tts-delay", type=float, default=0.4)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--cores", type=int, default=None, help="Mock mode: simulated CPU slots")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = None
+    if args.mode == "mock":
+        pipeline = MockPipeline(args.asr_delay, args.mt_delay, args.tts_delay,
+                                jitter=args.jitter, cores=args.cores, seed=args.seed)
+    elif args.mode == "local":
+        pipeline = LocalPipeline()
+    else:
+        from worker_server import InferenceServer
+        mock_delays = None
+        if args.mock:
+            mock_delays = {"asr": args.asr_delay, "translate": args.mt_delay, "tts": args.tts_delay}
+        upload = None
+        if args.mock and not os.path.exists(args.audio):
+            # Any audio does for mock workers: 3s of 16 kHz silence as WAV
+            import numpy as np
+            from audio_buffer import AudioBuffer
+            upload = AudioBuffer(np.zeros(3 * 16000, dtype=np.float32)).encode("wav")
+        server = InferenceServer(workers=args.workers, mock_delays=mock_delays).start()
+        pipeline = ServerPipeline(server, upload)
+
+    try:
+        rates = [float(r) for r in args.rates.split(",")]
+        results, saturation = find_saturation(
+            pipeline, rates, args.concurrency, args.requests, slo=args.slo,
+            audio_path=args.audio, target_lang=args.target_lang, seed=args.seed,
+        )
+    finally:
+        if server is not None:
+            server.stop()
+
+    print("\n📊 Summary")
+    for result in results:
+        print(f"  {result.rate:>6.2f} req/s → {result.throughput:.2f} req/s, "
+              f"p95 {result.summary()['total'][95]:.2f}s")
+    if saturation is None:
+        print("No saturation within the tested rates")
+    else:
+        print(f"Saturation point: {saturation:.2f} req/s at concurrency {args.concurrency}")
@@ -1,6 +1,4 @@
 import streamlit as st
-import tempfile
-import os
 import sys
 import time
 from io import BytesIO
@@ -11,9 +9,12 @@ if sys.platform == 'win32':
     sys.stderr.reconfigure(encoding='utf-8')
 
 # Import all models
-from asr_whisper import speech_to_text
-from translate_nllb import NLLBTranslator
-from tts_coqui import text_to_speech
+from audio_buffer import CopyStats
+from result_cache import content_hash, memoized
+from inference_opt import is_enabled
+from app_common import (
+    get_translator, result_caches, synthesize_bytes, transcribe_bytes,
+)
 
 # Page configuration
 st.set_page_config(
@@ -59,6 +60,10 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def main():
+    # Optimized mode: load, compile and warm the models at startup
+    if is_enabled():
+        get_translator()
+    
     # Header
     st.markdown("""
     <div class="main-header">
@@ -99,19 +104,22 @@ def main():
         
         if recorded_audio:
             st.success("✅ Recording complete! Processing...")
-            audio_bytes = recorded_audio.read()
+            audio_bytes = recorded_audio.getbuffer()  # memoryview, no copy
             process_audio(audio_bytes, target_lang[1])
     
     with col3:
         st.write("")  # Spacer
 
 def process_audio(audio_bytes, target_lang):
-    """Process audio through the complete pipeline"""
-    
-    # Save audio temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-        tmp_file.write(audio_bytes)
-        audio_path = tmp_file.name
+    """Process audio through the complete pipeline.
+
+    Stage results are memoized by audio hash plus stage parameters, so a
+    Streamlit rerun re-runs nothing and a language change re-runs only
+    translation and TTS.
+    """
+    caches = result_caches()
+    audio_id = content_hash(audio_bytes)
+    copy_stats = CopyStats()
     
     try:
         # Timing variables
@@ -121,7 +129,11 @@ def process_audio(audio_bytes, target_lang):
         # Step 1: ASR
         with st.spinner("🎧 Listening..."):
             start_time = time.time()
-            source_text = speech_to_text(audio_path)
+            source_text, _ = memoized(
+                caches, ("asr", audio_id),
+                lambda: transcribe_bytes(audio_bytes, copy_stats),
+                store_if=lambda text: bool(text.strip())
+            )
             timings['ASR'] = time.time() - start_time
             
             if not source_text.strip():
@@ -131,16 +143,21 @@ def process_audio(audio_bytes, target_lang):
         # Step 2: Translation
         with st.spinner("🌐 Translating..."):
             start_time = time.time()
-            translator = NLLBTranslator(target_lang)
-            translated_text = translator.translate(source_text)
+            translated_text, _ = memoized(
+                caches, ("mt", audio_id, target_lang),
+                lambda: get_translator().translate(source_text, target_lang)
+            )
             timings['Translation'] = time.time() - start_time
         
         # Step 3: TTS
         with st.spinner("🔊 Generating speech..."):
             start_time = time.time()
-            output_audio = "translated_speech.mp3"
-            text_to_speech(translated_text, output_audio)
+            (output_bytes, output_format), _ = memoized(
+                caches, ("tts", content_hash(translated_text), target_lang),
+                lambda: synthesize_bytes(translated_text, copy_stats)
+            )
             timings['TTS'] = time.time() - start_time
+            print(f"Audio copies: {copy_stats.copies} ({copy_stats.bytes_allocated / 1024:.1f} KB allocated)")
         
         # Calculate total time
         total_time = sum(timings.values())
@@ -169,7 +186,7 @@ def process_audio(audio_bytes, target_lang):
         ]
         
         for step, time_taken, icon in progress_data:
-            percentage = (time_taken / total_time) * 100
+            percentage = (time_taken / total_time) * 100 if total_time else 0.0
             st.markdown(f"{icon} **{step}**: {time_taken:.1f}s ({percentage:.1f}%)")
             st.progress(percentage / 100)
         
@@ -194,19 +211,18 @@ def process_audio(audio_bytes, target_lang):
             """, unsafe_allow_html=True)
         
         # Audio player
-        if os.path.exists(output_audio):
+        if output_bytes:
             st.markdown("---")
             st.subheader("🔊 Audio Output")
-            st.audio(output_audio, format='audio/mp3')
+            st.audio(output_bytes, format=f'audio/{output_format}')
             
             # Download button
-            with open(output_audio, "rb") as file:
-                st.download_button(
-                    label="📥 Download Audio",
-                    data=file.read(),
-                    file_name=f"translated_speech_{lang_name}.mp3",
-                    mime="audio/mpeg"
-                )
+            st.download_button(
+                label="📥 Download Audio",
+                data=output_bytes,
+                file_name=f"translated_speech_{lang_name}.{output_format}",
+                mime="audio/mpeg" if output_format == "mp3" else "audio/wav"
+            )
         
         # Success message with performance
         if total_time < 10:
@@ -214,17 +230,9 @@ def process_audio(audio_bytes, target_lang):
         else:
             st.success(f"🎉 Translation complete! Total time: {total_time:.1f}s")
         
-        # Cleanup
-        os.unlink(output_audio)
-        
     except Exception as e:
         st.error(f"❌ Error: {str(e)}")
         st.info("💡 Please try recording again")
-    
-    finally:
-        # Cleanup temp file
-        if os.path.exists(audio_path):
-            os.unlink(audio_path)
 
 # Instructions section
 with st.expander("💡 How to use"):
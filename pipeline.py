@@ -8,6 +8,7 @@ if sys.platform == "win32":
     sys.stderr.reconfigure(encoding="utf-8")
 
 from asr_whisper import speech_to_text
+from audio_buffer import AudioBuffer, audio_stats
 from translate_nllb import NLLBTranslator
 from llm_tinyllama import refine_text
 from tts_coqui import text_to_speech
@@ -18,7 +19,14 @@ def full_pipeline(audio_input, target_lang="fra_Latn"):
     
     print("STEP 1: Speech → Text (ASR)")
     start_time = time.time()
-    source_text = speech_to_text(audio_input)
+    with audio_stats() as copy_stats:
+        try:
+            # Decoded once here; every ASR engine reads the same buffer
+            audio = AudioBuffer.from_file(audio_input)
+        except Exception as e:
+            print(f"ASR Error: could not read {audio_input}: {e}")
+            audio = None
+        source_text = speech_to_text(audio) if audio is not None else ""
     asr_time = time.time() - start_time
     print(f"Recognized Text: {source_text}")
     print(f"ASR Time: {asr_time:.2f} seconds")
@@ -41,7 +49,8 @@ def full_pipeline(audio_input, target_lang="fra_Latn"):
     print("\nSTEP 4: Text → Speech (Coqui TTS)")
     start_time = time.time()
     output_audio = "final_output.wav"
-    text_to_speech(refined_text, output_audio)
+    with audio_stats(copy_stats):
+        output_audio = text_to_speech(refined_text, output_audio)
     tts_time = time.time() - start_time
     print(f"Generated Audio: {output_audio}")
     print(f"TTS Time: {tts_time:.2f} seconds")
@@ -52,6 +61,7 @@ def full_pipeline(audio_input, target_lang="fra_Latn"):
     print(f"   - Translation: {mt_time:.2f}s ({mt_time/total_time*100:.1f}%)")
     print(f"   - LLM Refinement: {llm_time:.2f}s ({llm_time/total_time*100:.1f}%)")
     print(f"   - TTS: {tts_time:.2f}s ({tts_time/total_time*100:.1f}%)")
+    print(f"Audio copies: {copy_stats.copies} ({copy_stats.bytes_allocated / 1024:.1f} KB allocated)")
 
     return refined_text, output_audio
 
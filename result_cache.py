@@ -0,0 +1,93 @@
+# result_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_hash(data) -> str:
+    """Stable key for audio bytes or text"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _size_of(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (tuple, list)):
+        return sum(_size_of(v) for v in value)
+    return 64
+
+
+class ResultCache:
+    """LRU cache of stage results, bounded by entry count and total bytes.
+
+    Thread-safe, so one instance can be shared across Streamlit sessions.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_MISSING = object()
+
+
+def memoized(caches, key, compute, store_if=None):
+    """Return (value, hit) for `key`, computing and storing it on a miss.
+
+    `caches` are checked in order (e.g. session first, then shared); a hit
+    in a later cache is copied into the earlier ones. Results failing
+    `store_if` (e.g. an empty transcript) are returned but not stored.
+    """
+    for i, cache in enumerate(caches):
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            for earlier in caches[:i]:
+                earlier.put(key, value)
+            return value, True
+    value = compute()
+    if store_if is not None and not store_if(value):
+        return value, False
+    for cache in caches:
+        cache.put(key, value)
+    return value, False
@@ -1,6 +1,4 @@
 import streamlit as st
-import tempfile
-import os
 import sys
 import time
 from io import BytesIO
@@ -11,9 +9,13 @@ if sys.platform == 'win32':
     sys.stderr.reconfigure(encoding='utf-8')
 
 # Import models
-from asr_whisper import speech_to_text
-from translate_nllb import NLLBTranslator
-from tts_coqui import text_to_speech
+from audio_buffer import CopyStats
+from result_cache import content_hash, memoized
+from inference_opt import is_enabled
+from app_common import (
+    USE_STAGE_SERVER, get_stage_server, get_translator, result_caches,
+    serve_bytes, synthesize_bytes, transcribe_bytes,
+)
 
 # Page configuration
 st.set_page_config(
@@ -150,6 +152,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def main():
+    if USE_STAGE_SERVER:
+        # Start the worker pools (and load their models) before the first request
+        get_stage_server()
+    elif is_enabled():
+        # Optimized mode: load, compile and warm the models at startup
+        get_translator()
+    
     # Header
     st.markdown("""
     <div class="main-header fade-in">
@@ -205,17 +214,20 @@ def main():
             if recorded_audio:
                 st.markdown('<div class="fade-in">', unsafe_allow_html=True)
                 st.success("✅ Recording complete! Processing...")
-                audio_bytes = recorded_audio.read()
+                audio_bytes = recorded_audio.getbuffer()  # memoryview, no copy
                 process_audio_fast(audio_bytes, target_lang[1])
                 st.markdown('</div>', unsafe_allow_html=True)
 
 def process_audio_fast(audio_bytes, target_lang):
-    """Fast audio processing without LLM"""
-    
-    # Save audio temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-        tmp_file.write(audio_bytes)
-        audio_path = tmp_file.name
+    """Fast audio processing without LLM.
+
+    Each stage result is memoized by audio hash plus stage parameters, so
+    a Streamlit rerun re-runs nothing and a language change re-runs only
+    translation and TTS.
+    """
+    caches = result_caches()
+    audio_id = content_hash(audio_bytes)
+    copy_stats = CopyStats()
     
     try:
         # Progress tracking
@@ -224,31 +236,55 @@ def process_audio_fast(audio_bytes, target_lang):
         
         timings = {}
         
-        # Step 1: ASR
-        status_text.text("🎧 Listening to your speech...")
-        start_time = time.time()
-        source_text = speech_to_text(audio_path)
-        timings['ASR'] = time.time() - start_time
-        progress_bar.progress(25)
+        if USE_STAGE_SERVER:
+            # All three stages run in the stage server's worker pools
+            status_text.text("🎧 Translating your speech...")
+            start_time = time.time()
+            (source_text, translated_text, (output_bytes, output_format)), _ = memoized(
+                caches, ("s2s", audio_id, target_lang),
+                lambda: serve_bytes(audio_bytes, target_lang, copy_stats),
+                store_if=lambda result: bool(result[0].strip())
+            )
+            timings['Pipeline'] = time.time() - start_time
+            
+            if not source_text.strip():
+                st.error("❌ No speech detected. Please try again.")
+                return
+        else:
+            # Step 1: ASR
+            status_text.text("🎧 Listening to your speech...")
+            start_time = time.time()
+            source_text, _ = memoized(
+                caches, ("asr", audio_id),
+                lambda: transcribe_bytes(audio_bytes, copy_stats),
+                store_if=lambda text: bool(text.strip())
+            )
+            timings['ASR'] = time.time() - start_time
+            progress_bar.progress(25)
         
-        if not source_text.strip():
-            st.error("❌ No speech detected. Please try again.")
-            return
+            if not source_text.strip():
+                st.error("❌ No speech detected. Please try again.")
+                return
         
-        # Step 2: Translation
-        status_text.text("🌐 Translating to target language...")
-        start_time = time.time()
-        translator = NLLBTranslator(target_lang)
-        translated_text = translator.translate(source_text)
-        timings['Translation'] = time.time() - start_time
-        progress_bar.progress(75)
+            # Step 2: Translation
+            status_text.text("🌐 Translating to target language...")
+            start_time = time.time()
+            translated_text, _ = memoized(
+                caches, ("mt", audio_id, target_lang),
+                lambda: get_translator().translate(source_text, target_lang)
+            )
+            timings['Translation'] = time.time() - start_time
+            progress_bar.progress(75)
         
-        # Step 3: TTS
-        status_text.text("🔊 Generating translated speech...")
-        start_time = time.time()
-        output_audio = "translated_speech.mp3"
-        text_to_speech(translated_text, output_audio)
-        timings['TTS'] = time.time() - start_time
+            # Step 3: TTS
+            status_text.text("🔊 Generating translated speech...")
+            start_time = time.time()
+            (output_bytes, output_format), _ = memoized(
+                caches, ("tts", content_hash(translated_text), target_lang),
+                lambda: synthesize_bytes(translated_text, copy_stats)
+            )
+            timings['TTS'] = time.time() - start_time
+        print(f"Audio copies: {copy_stats.copies} ({copy_stats.bytes_allocated / 1024:.1f} KB allocated)")
         progress_bar.progress(100)
         
         # Clear progress
@@ -288,7 +324,7 @@ def process_audio_fast(audio_bytes, target_lang):
         """, unsafe_allow_html=True)
         
         # Audio player
-        if os.path.exists(output_audio):
+        if output_bytes:
             st.markdown(f"""
             <div class="audio-player fade-in">
                 <h4 style="margin: 0;">🔊 Translated Speech</h4>
@@ -296,31 +332,22 @@ def process_audio_fast(audio_bytes, target_lang):
             </div>
             """, unsafe_allow_html=True)
             
-            st.audio(output_audio, format='audio/mp3')
+            st.audio(output_bytes, format=f'audio/{output_format}')
             
             # Download button
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
-                with open(output_audio, "rb") as file:
-                    st.download_button(
-                        label="📥 Download Audio",
-                        data=file.read(),
-                        file_name=f"translated_speech_{lang_name}.mp3",
-                        mime="audio/mpeg",
-                        use_container_width=True
-                    )
-            
-            # Cleanup
-            os.unlink(output_audio)
+                st.download_button(
+                    label="📥 Download Audio",
+                    data=output_bytes,
+                    file_name=f"translated_speech_{lang_name}.{output_format}",
+                    mime="audio/mpeg" if output_format == "mp3" else "audio/wav",
+                    use_container_width=True
+                )
         
     except Exception as e:
         st.error(f"❌ Error: {str(e)}")
         st.info("💡 Please try recording again")
-    
-    finally:
-        # Cleanup temp file
-        if os.path.exists(audio_path):
-            os.unlink(audio_path)
 
 # Footer
 st.markdown("""
@@ -0,0 +1,395 @@
+# stage_server.py
+import argparse
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+STAGES = ("asr", "mt", "tts")
+
+
+class SharedAudio:
+    """Audio samples living in a named shared-memory block.
+
+    Only the small descriptor (name, shape, dtype, rate, format) crosses
+    process boundaries; every process maps the same pages. Ownership moves
+    with the descriptor: whoever consumes it last calls `release()`.
+    """
+
+    def __init__(self, shm, shape, dtype, sample_rate, fmt):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+        self.sample_rate = sample_rate
+        self.format = fmt  # "pcm_f32" samples or encoded bytes such as "mp3"
+
+    @classmethod
+    def create(cls, data, sample_rate, fmt="pcm_f32"):
+        data = np.asarray(data)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        audio = cls(shm, data.shape, data.dtype, sample_rate, fmt)
+        audio.array[...] = data
+        return audio
+
+    @classmethod
+    def attach(cls, descriptor):
+        name, shape, dtype, sample_rate, fmt = descriptor
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype, sample_rate, fmt)
+
+    @property
+    def descriptor(self):
+        return (self.shm.name, self.shape, self.dtype.str, self.sample_rate, self.format)
+
+    def tobytes(self):
+        return self.array.tobytes()
+
+    def close(self):
+        self.array = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a view of the samples is still alive; its mapping goes with it
+
+    def release(self):
+        """Close and free the block (the last owner calls this)"""
+        self.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass  # already freed along with a failed request
+
+
+# Stage implementations: built once per worker process, then called per job
+
+def _real_stage(stage):
+    if stage == "asr":
+        from asr_whisper import load_whisper_model, transcribe_with_outcome
+        from audio_buffer import AudioBuffer
+        load_whisper_model("tiny")  # load now, not on the first job
+
+        def asr(job, audio):
+            # Same engine race, timeouts and short-audio check as in-process
+            outcome = transcribe_with_outcome(AudioBuffer.from_samples(audio.array, audio.sample_rate))
+            return {"text": outcome.text, "asr_engine": outcome.engine}
+        return asr
+
+    if stage == "mt":
+        from translate_nllb import NLLBTranslator
+        translator = NLLBTranslator()
+
+        def mt(job, audio):
+            return {"translation": translator.translate(job["text"], job["target_lang"])}
+        return mt
+
+    from tts_coqui import text_to_speech_buffer
+
+    def tts(job, audio):
+        speech = text_to_speech_buffer(job["translation"])
+        if speech.format == "mp3":
+            out = SharedAudio.create(np.frombuffer(speech.encode(), dtype=np.uint8), 0, fmt="mp3")
+        else:
+            out = SharedAudio.create(speech.samples, speech.sample_rate)
+        out.close()
+        return {"audio": out.descriptor}
+    return tts
+
+
+def _mock_stage(stage, delay):
+    """Synthetic stage for exercising the orchestration without models"""
+    def run(job, audio):
+        time.sleep(delay)
+        if stage == "asr":
+            return {"text": "hello world"}
+        if stage == "mt":
+            return {"translation": f"[{job['target_lang']}] {job['text']}"}
+        t = np.arange(22050, dtype=np.float32) / 22050
+        out = SharedAudio.create(0.1 * np.sin(2 * np.pi * 440 * t), 22050)
+        out.close()
+        return {"audio": out.descriptor}
+    return run
+
+
+def _stage_worker(stage, inbox, outbox, done, waiting, busy, next_waiting, current, abandoned,
+                  mock_delay):
+    run = _mock_stage(stage, mock_delay) if mock_delay is not None else _real_stage(stage)
+    while True:
+        job = inbox.get()
+        if job is None:
+            break
+        with waiting.get_lock():
+            waiting.value -= 1
+        if abandoned.is_set():
+            continue  # the server has failed every request (and freed its input)
+        with busy.get_lock():
+            busy.value += 1
+        current.value = job["id"]  # read by the parent if this process dies
+
+        try:
+            audio = SharedAudio.attach(job.pop("input")) if "input" in job else None
+        except FileNotFoundError:
+            # The request failed while queued and its input was freed: drop it
+            current.value = -1
+            with busy.get_lock():
+                busy.value -= 1
+            continue
+        start = time.time()
+        try:
+            job.update(run(job, audio))
+            target = outbox
+        except Exception as e:
+            job["error"] = f"{stage}: {type(e).__name__}: {e}"
+            target = done
+        finally:
+            if audio is not None:
+                audio.release()  # the input is not needed past ASR
+        job["timings"][stage] = time.time() - start
+
+        current.value = -1
+        with busy.get_lock():
+            busy.value -= 1
+        if target is outbox and next_waiting is not None:
+            with next_waiting.get_lock():
+                next_waiting.value += 1
+        target.put(job)
+
+
+class StageServer:
+    """Orchestrator for ASR, MT and TTS running in separate worker pools.
+
+    Each stage has its own inbox queue and `replicas[stage]` processes, so
+    the bottleneck stage can be scaled on its own. Audio moves as
+    SharedAudio descriptors rather than pickled arrays or temp files.
+    `queue_depths()` shows how many jobs wait at (and are inside) each
+    stage: a stage with a growing queue is the one to scale.
+
+    A worker that dies fails the request it was holding (and frees its
+    input block); once a stage has no live worker left, every pending
+    request fails, since none of them can get through, and the queued
+    jobs are dropped so the depths go back to zero.
+
+    With `mock_delays` ({stage: seconds}) the stages sleep instead of
+    loading models.
+    """
+
+    def __init__(self, replicas=None, mock_delays=None):
+        self.replicas = {stage: 1 for stage in STAGES}
+        self.replicas.update(replicas or {})
+        self.mock_delays = mock_delays
+        self.ctx = mp.get_context("spawn")
+        self.processes = []
+        self._workers = []  # (stage, process, shared id of the job it holds)
+        self._dead = set()
+        self._pending = {}
+        self._inputs = {}  # request id -> input SharedAudio, until the request ends
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.inboxes = {stage: self.ctx.Queue() for stage in STAGES}
+        self.done = self.ctx.Queue()
+        self.waiting = {stage: self.ctx.Value("i", 0) for stage in STAGES}
+        self.abandoned = self.ctx.Event()
+        self.busy = {stage: self.ctx.Value("i", 0) for stage in STAGES}
+        outboxes = {"asr": self.inboxes["mt"], "mt": self.inboxes["tts"], "tts": self.done}
+        next_waiting = {"asr": self.waiting["mt"], "mt": self.waiting["tts"], "tts": None}
+
+        for stage in STAGES:
+            delay = self.mock_delays.get(stage, 0.0) if self.mock_delays is not None else None
+            for _ in range(self.replicas[stage]):
+                current = self.ctx.Value("q", -1, lock=False)
+                proc = self.ctx.Process(
+                    target=_stage_worker,
+                    args=(stage, self.inboxes[stage], outboxes[stage], self.done,
+                          self.waiting[stage], self.busy[stage], next_waiting[stage], current,
+                          self.abandoned, delay),
+                    daemon=True,
+                )
+                proc.start()
+                self.processes.append(proc)
+                self._workers.append((stage, proc, current))
+        print("Stage workers: " + ", ".join(f"{s}×{self.replicas[s]}" for s in STAGES))
+
+        self._stopping = threading.Event()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch_workers, daemon=True)
+        self._monitor.start()
+        return self
+
+    def _collect(self):
+        while True:
+            job = self.done.get()
+            if job is None:
+                break
+            # Wrap before anything else so a result's block is always owned
+            if "audio" in job:
+                job["audio"] = SharedAudio.attach(job["audio"])
+            job["timings"]["total"] = time.time() - job.pop("submitted")
+            with self._lock:
+                future = self._pending.pop(job["id"], None)
+                self._inputs.pop(job["id"], None)  # released by the ASR worker
+            if future is None:
+                if "audio" in job:
+                    job["audio"].release()
+            elif "error" in job:
+                future.set_exception(RuntimeError(job["error"]))
+            else:
+                future.set_result(job)
+
+    def _fail(self, request_id, reason):
+        with self._lock:
+            future = self._pending.pop(request_id, None)
+            shared = self._inputs.pop(request_id, None)
+        if shared is not None:
+            try:
+                shared.shm.unlink()
+            except FileNotFoundError:
+                pass  # the ASR worker already freed it
+        if future is not None:
+            future.set_exception(RuntimeError(reason))
+
+    def _watch_workers(self):
+        while not self._stopping.wait(1.0):
+            for stage, proc, current in self._workers:
+                if proc.is_alive() or proc.pid in self._dead:
+                    continue
+                self._dead.add(proc.pid)
+                print(f"{stage} worker {proc.pid} exited with code {proc.exitcode}")
+                request_id = current.value
+                if request_id >= 0:
+                    with self.busy[stage].get_lock():
+                        self.busy[stage].value -= 1
+                    self._fail(request_id, f"{stage} worker {proc.pid} died (exit code {proc.exitcode})")
+            stranded = self._stranded_stage()
+            if stranded is not None:
+                # Live stages skip what is queued; nobody drains the dead one
+                self.abandoned.set()
+                with self._lock:
+                    pending = list(self._pending)
+                for request_id in pending:
+                    self._fail(request_id, f"no {stranded} workers left")
+                self._drain(stranded)
+
+    def _drain(self, stage):
+        """Drop the jobs queued for a stage that has no workers"""
+        while True:
+            try:
+                job = self.inboxes[stage].get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                with self.waiting[stage].get_lock():
+                    self.waiting[stage].value -= 1
+
+    def _stranded_stage(self):
+        """A stage whose workers have all died, or None"""
+        for stage in STAGES:
+            if all(proc.pid in self._dead for s, proc, _ in self._workers if s == stage):
+                return stage
+        return None
+
+    def _enqueue(self, stage, job):
+        with self.waiting[stage].get_lock():
+            self.waiting[stage].value += 1
+        self.inboxes[stage].put(job)
+
+    def submit(self, audio, target_lang="fra_Latn"):
+        """Queue one request; `audio` is a path or 16 kHz float32 samples.
+
+        The Future resolves to a dict with text, translation, timings and
+        `audio`, a SharedAudio the caller must `release()` when done.
+        """
+        stranded = self._stranded_stage()
+        if stranded is not None:
+            raise RuntimeError(f"No {stranded} workers left")
+        if isinstance(audio, str):
+            import whisper
+            audio = whisper.load_audio(audio)
+        shared = SharedAudio.create(np.asarray(audio, dtype=np.float32), 16000)
+        shared.close()
+
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = future
+            self._inputs[request_id] = shared
+        self._enqueue("asr", {
+            "id": request_id,
+            "input": shared.descriptor,
+            "target_lang": target_lang,
+            "timings": {},
+            "submitted": time.time(),
+        })
+        return future
+
+    def queue_depths(self):
+        """{stage: (waiting, in progress)} across that stage's replicas"""
+        return {stage: (self.waiting[stage].value, self.busy[stage].value) for stage in STAGES}
+
+    def stop(self):
+        self._stopping.set()
+        self._monitor.join(timeout=10)
+        for stage in STAGES:
+            for _ in range(self.replicas[stage]):
+                self.inboxes[stage].put(None)
+        for proc in self.processes:
+            proc.join(timeout=10)
+        self.done.put(None)
+        self._collector.join(timeout=10)
+        self.processes = []
+        self._workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ASR, MT and TTS as separately scaled worker pools")
+    parser.add_argument("--asr", type=int, default=1, help="ASR replicas")
+    parser.add_argument("--mt", type=int, default=1, help="MT replicas")
+    parser.add_argument("--tts", type=int, default=1, help="TTS replicas")
+    parser.add_argument("--audio", default="sample.wav")
+    parser.add_argument("--target-lang", default="fra_Latn")
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--mock", action="store_true", help="Synthetic stage delays instead of models")
+    parser.add_argument("--mock-delays", default="0.3,0.2,0.6", help="ASR,MT,TTS seconds for --mock")
+    args = parser.parse_args()
+
+    mock_delays = None
+    if args.mock:
+        mock_delays = dict(zip(STAGES, (float(d) for d in args.mock_delays.split(","))))
+        audio = np.zeros(16000 * 3, dtype=np.float32)
+    else:
+        audio = args.audio
+
+    with StageServer({"asr": args.asr, "mt": args.mt, "tts": args.tts}, mock_delays) as server:
+        start_time = time.time()
+        futures = [server.submit(audio, args.target_lang) for _ in range(args.requests)]
+        while not all(f.done() for f in futures):
+            depths = server.queue_depths()
+            print("Queue depths (waiting/running): " +
+                  "  ".join(f"{s}={w}/{b}" for s, (w, b) in depths.items()))
+            time.sleep(0.5)
+        elapsed = time.time() - start_time
+
+        for future in futures:
+            try:
+                result = future.result()
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                continue
+            timings = result["timings"]
+            print(f"{result['translation']!r} • " +
+                  " ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
+            result["audio"].release()
+        print(f"\n⏱️  {args.requests} requests in {elapsed:.2f}s "
+              f"({args.requests / elapsed:.2f} req/s)")
@@ -0,0 +1,117 @@
+# tests/test_asr_fallback.py
+import threading
+
+from asr_fallback import FallbackPolicy, LocalRecognizer, race_asr
+
+
+class RecordingEngine(LocalRecognizer):
+    """LocalRecognizer that keeps the cancel Event it was given"""
+
+    def __call__(self, audio_path, cancel=None):
+        self.cancel = cancel
+        return super().__call__(audio_path, cancel)
+
+
+def policy(**kwargs):
+    kwargs.setdefault("deadline", 5.0)
+    return FallbackPolicy(**kwargs)
+
+
+def test_primary_timeout_falls_back():
+    primary = RecordingEngine(hang=True)
+    outcome = race_asr("clip.wav", [
+        ("primary", primary),
+        ("backup", LocalRecognizer(text="hello")),
+    ], policy(engine_timeouts={"primary": 0.2}))
+
+    assert outcome.text == "hello"
+    assert outcome.engine == "backup"
+    assert "fallback after primary timed out" in outcome.reason
+    assert ("primary", "timed out", 0.2) in outcome.attempts
+    assert primary.cancel.is_set()
+
+
+def test_hedge_fires_at_default_delay():
+    outcome = race_asr("clip.wav", [
+        ("primary", LocalRecognizer(text="slow", delay=2.0)),
+        ("backup", LocalRecognizer(text="fast", delay=0.05)),
+    ], policy(hedge=True, hedge_default_delay=0.2))
+
+    assert outcome.engine == "backup"
+    assert "hedged after primary exceeded its default hedge delay" in outcome.reason
+    assert 0.2 <= outcome.elapsed < 1.0
+
+
+def test_hedge_uses_observed_quantile():
+    hedging = policy(hedge=True, hedge_min_samples=3, hedge_default_delay=5.0)
+    for seconds in (0.1, 0.1, 0.1):
+        hedging.record_latency("primary", seconds)
+    outcome = race_asr("clip.wav", [
+        ("primary", LocalRecognizer(text="slow", delay=2.0)),
+        ("backup", LocalRecognizer(text="fast")),
+    ], hedging)
+
+    assert outcome.engine == "backup"
+    assert "p95 latency" in outcome.reason
+    assert outcome.elapsed < 1.0
+
+
+def test_losers_are_cancelled_and_recorded():
+    primary = RecordingEngine(hang=True)
+    hedging = policy(hedge=True, hedge_default_delay=0.1)
+    outcome = race_asr("clip.wav", [
+        ("primary", primary),
+        ("backup", LocalRecognizer(text="hello")),
+    ], hedging)
+
+    assert outcome.engine == "backup"
+    assert primary.calls == 1
+    assert primary.cancel.is_set()
+    assert [a[:2] for a in outcome.attempts] == [("backup", "won"), ("primary", "cancelled")]
+    # The cancelled run counts as a (lower-bound) latency sample
+    assert len(hedging.latencies["primary"]) == 1
+
+
+def test_deadline_exceeded():
+    engines = [("a", RecordingEngine(hang=True)), ("b", RecordingEngine(hang=True))]
+    outcome = race_asr("clip.wav", engines, policy(
+        deadline=0.3, hedge=True, hedge_default_delay=0.1, default_timeout=10.0))
+
+    assert outcome.text == ""
+    assert outcome.engine is None
+    assert "deadline" in outcome.reason
+    assert all(engine.cancel.is_set() for _, engine in engines)
+
+
+def test_empty_result_moves_to_next_engine():
+    backup = LocalRecognizer(text="hello")
+    outcome = race_asr("clip.wav", [
+        ("primary", LocalRecognizer(text="  ")),
+        ("backup", backup),
+    ], policy())
+
+    assert outcome.engine == "backup"
+    assert ("primary", "empty result") in [a[:2] for a in outcome.attempts]
+    assert backup.calls == 1
+
+
+def test_failure_moves_to_next_engine():
+    outcome = race_asr("clip.wav", [
+        ("primary", LocalRecognizer(fail=True)),
+        ("backup", LocalRecognizer(text="hello")),
+    ], policy())
+
+    assert outcome.engine == "backup"
+    assert "primary failed" in outcome.reason
+
+
+def test_cancelled_threads_exit():
+    before = threading.active_count()
+    race_asr("clip.wav", [
+        ("primary", LocalRecognizer(hang=True)),
+        ("backup", LocalRecognizer(text="hello")),
+    ], policy(hedge=True, hedge_default_delay=0.05))
+    for thread in threading.enumerate():
+        if thread.name.startswith("asr-"):
+            thread.join(timeout=1.0)
+    assert threading.active_count() == before
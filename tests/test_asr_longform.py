@@ -0,0 +1,73 @@
+# tests/test_asr_longform.py
+import numpy as np
+
+from asr_longform import SAMPLE_RATE, find_split_points, plan_chunks, stitch_segments
+
+
+def noisy_audio(seconds, silences=()):
+    """White noise with silent (start, end) second ranges cut into it"""
+    rng = np.random.default_rng(0)
+    audio = (0.1 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+    for start, end in silences:
+        audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = 0.0
+    return audio
+
+
+def word(text, start, end):
+    return {"word": f" {text}", "start": start, "end": end}
+
+
+def segment(*words):
+    return {"start": words[0]["start"], "end": words[-1]["end"],
+            "text": "".join(w["word"] for w in words).strip(), "words": list(words)}
+
+
+def test_short_audio_is_not_split():
+    assert find_split_points(noisy_audio(20)) == []
+
+
+def test_splits_land_in_the_quietest_frame():
+    splits = find_split_points(noisy_audio(70, silences=[(25.5, 25.8), (52.0, 52.3)]))
+    seconds = [split / SAMPLE_RATE for split in splits]
+    assert len(seconds) == 2
+    assert 25.5 <= seconds[0] <= 25.8
+    assert 52.0 <= seconds[1] <= 52.3
+
+
+def test_plan_chunks_overlaps_and_covers_the_audio():
+    audio = noisy_audio(70, silences=[(25.5, 25.8), (52.0, 52.3)])
+    chunks = plan_chunks(audio)
+    overlap = SAMPLE_RATE  # OVERLAP_SECONDS
+
+    assert chunks[0][0] == 0 and chunks[0][2] == 0
+    assert chunks[-1][1] == len(audio) and chunks[-1][3] == len(audio)
+    for (_, core_end, _, end), (core_start, _, start, _) in zip(chunks, chunks[1:]):
+        assert core_end == core_start
+        assert end == core_end + overlap
+        assert start == core_start - overlap
+
+
+def test_stitch_keeps_overlap_words_once():
+    split = 28 * SAMPLE_RATE
+    first = [segment(word("a", 0.0, 1.0), word("b", 27.5, 27.9), word("c", 28.2, 28.6))]
+    # The second chunk starts 1s early, so it hears "b" and "c" again
+    second = [segment(word("b", 27.5, 27.9), word("c", 28.2, 28.6), word("d", 30.0, 31.0))]
+
+    merged = stitch_segments([(0, split, first), (split, 40 * SAMPLE_RATE, second)])
+
+    assert [seg["text"] for seg in merged] == ["a b", "c d"]
+    assert merged[1]["start"] == 28.2
+
+
+def test_stitch_keeps_words_past_the_end_of_the_audio():
+    # Whisper can place the last word beyond a 5s file's end
+    segments = [segment(word("hello", 4.0, 4.5), word("there", 4.6, 7.0))]
+    merged = stitch_segments([(0, 5 * SAMPLE_RATE, segments)])
+    assert [seg["text"] for seg in merged] == ["hello there"]
+
+
+def test_stitch_drops_segments_with_no_owned_words():
+    split = 28 * SAMPLE_RATE
+    second = [segment(word("b", 27.2, 27.6)), segment(word("d", 30.0, 31.0))]
+    merged = stitch_segments([(0, split, []), (split, 40 * SAMPLE_RATE, second)])
+    assert [seg["text"] for seg in merged] == ["d"]
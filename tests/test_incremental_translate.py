@@ -0,0 +1,95 @@
+# tests/test_incremental_translate.py
+from incremental_translate import IncrementalTranslator
+
+
+class FakeTokenizer:
+    def __init__(self):
+        self.vocab = {}
+
+    def id_for(self, word):
+        return self.vocab.setdefault(word, len(self.vocab) + 1)
+
+    def decode(self, ids, skip_special_tokens=True):
+        words = {i: w for w, i in self.vocab.items()}
+        return " ".join(words[i] for i in ids)
+
+
+class FakeTranslator:
+    """'Translates' by upper-casing words; returns only ids past the forced prefix"""
+
+    target_lang = "fra_Latn"
+
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+        self.calls = []
+
+    def generate_ids(self, text, target_lang=None, prefix_ids=None):
+        prefix_ids = list(prefix_ids or [])
+        self.calls.append((text, prefix_ids))
+        ids = [self.tokenizer.id_for(w.upper()) for w in text.split()]
+        return ids[len(prefix_ids):]
+
+
+def test_only_the_tail_is_redecoded():
+    translator = FakeTranslator()
+    captions = IncrementalTranslator(translator)
+
+    assert captions.update("hello") == "HELLO"
+    assert captions.update("hello world. good") == "HELLO WORLD. GOOD"
+    translator.calls.clear()
+    assert captions.update("hello world. good morning") == "HELLO WORLD. GOOD MORNING"
+
+    # One decode of the open sentence, forced to start with the committed ids
+    (source, prefix), = translator.calls
+    assert source == "hello world. good morning"
+    assert captions._decode_text(prefix) == "HELLO WORLD."
+    assert captions.committed_text == "HELLO WORLD."
+
+
+def test_finished_tail_is_reused_not_redecoded():
+    translator = FakeTranslator()
+    captions = IncrementalTranslator(translator)
+    captions.update("hello world.")
+    translator.calls.clear()
+
+    captions.update("hello world. next")
+    assert [source for source, _ in translator.calls] == ["hello world. next"]
+
+
+def test_context_is_bounded():
+    translator = FakeTranslator()
+    captions = IncrementalTranslator(translator, context_sentences=1)
+    captions.update("one. two. three. four")
+    source, _ = translator.calls[-1]
+    assert source == "three. four"
+
+
+def test_revised_source_resets():
+    captions = IncrementalTranslator(FakeTranslator())
+    captions.update("hello world. good")
+    assert captions.update("hello word. good") == "HELLO WORD. GOOD"
+    assert captions.stats()["resets"] == 1
+
+
+def test_update_after_finish_does_not_reset():
+    translator = FakeTranslator()
+    captions = IncrementalTranslator(translator)
+    captions.update("hello world. good morning")
+    assert captions.finish() == "HELLO WORLD. GOOD MORNING"
+    translator.calls.clear()
+
+    assert captions.update("hello world. good morning") == "HELLO WORLD. GOOD MORNING"
+    assert translator.calls == []
+    captions.update("hello world. good morning. bye")
+    assert captions.stats()["resets"] == 0
+    assert [source for source, _ in translator.calls] == ["hello world. good morning. bye"]
+
+
+def test_stats_count_saved_tokens():
+    captions = IncrementalTranslator(FakeTranslator())
+    for text in ("a b.", "a b. c", "a b. c d", "a b. c d e"):
+        captions.update(text)
+    stats = captions.stats()
+    assert stats["updates"] == 4
+    assert stats["redecoded_tokens"] < stats["full_retranslation_tokens"]
+    assert 0 < stats["saved"] < 1
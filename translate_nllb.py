@@ -2,6 +2,8 @@
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 import torch
 
+from inference_opt import bucket_length, inference_context, is_enabled, optimize_translator
+
 class NLLBTranslator:
     def __init__(self, target_lang="fra_Latn", source_lang="eng_Latn"):  # English → French
         self.model_name = "facebook/nllb-200-distilled-600M"
@@ -16,17 +18,60 @@ class NLLBTranslator:
         
         self.source_lang = source_lang
         self.target_lang = target_lang
+        
+        # Set by optimize_translator: pad inputs to fixed lengths for the compiled encoder
+        self.seq_buckets = None
+        if is_enabled():
+            optimize_translator(self)
 
-    def translate(self, text: str) -> str:
+    def _encode(self, text: str):
         # Set source language
         self.tokenizer.src_lang = self.source_lang
         
-        inputs = self.tokenizer(text, return_tensors="pt")
+        if self.seq_buckets:
+            length = len(self.tokenizer(text)["input_ids"])
+            inputs = self.tokenizer(
+                text, return_tensors="pt",
+                padding="max_length", max_length=bucket_length(length)
+            )
+        else:
+            inputs = self.tokenizer(text, return_tensors="pt")
         # Move inputs to same device as model
-        inputs = {k: v.to(self.model.device) for k, v in inputs.items()}
+        return {k: v.to(self.model.device) for k, v in inputs.items()}
+
+    def translate(self, text: str, target_lang: str = None) -> str:
+        target_lang = target_lang or self.target_lang
+        inputs = self._encode(text)
         
-        generated_tokens = self.model.generate(
-            **inputs,
-            forced_bos_token_id=self.tokenizer.lang_code_to_id[self.target_lang]
-        )
+        with inference_context(self.model.device.type):
+            generated_tokens = self.model.generate(
+                **inputs,
+                forced_bos_token_id=self.tokenizer.lang_code_to_id[target_lang]
+            )
         return self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)[0]
+
+    def generate_ids(self, text: str, target_lang: str = None, prefix_ids=None, max_new_tokens: int = 200):
+        """Decode `text` with the output forced to start with `prefix_ids`.
+
+        Returns only the newly decoded target token ids (no language code,
+        no </s>), so callers can keep an already-shown prefix stable.
+        """
+        target_lang = target_lang or self.target_lang
+        inputs = self._encode(text)
+        
+        prefix = [
+            self.model.config.decoder_start_token_id,
+            self.tokenizer.lang_code_to_id[target_lang],
+        ] + list(prefix_ids or [])
+        decoder_input_ids = torch.tensor([prefix], device=self.model.device)
+        
+        with inference_context(self.model.device.type):
+            output = self.model.generate(
+                **inputs,
+                decoder_input_ids=decoder_input_ids,
+                max_new_tokens=max_new_tokens
+            )
+        new_ids = output[0, len(prefix):].tolist()
+        if self.tokenizer.eos_token_id in new_ids:
+            new_ids = new_ids[:new_ids.index(self.tokenizer.eos_token_id)]
+        return new_ids
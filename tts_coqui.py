@@ -1,29 +1,51 @@
 # tts_coqui.py
+from io import BytesIO
+
+from audio_buffer import AudioBuffer
+from inference_opt import inference_context
+
 try:
     from TTS.api import TTS
-    import soundfile as sf
     TTS_AVAILABLE = True
 except ImportError:
     TTS_AVAILABLE = False
     print("Warning: TTS not installed. Using gTTS fallback.")
-    from gtts import gTTS
-    import os
 
-def text_to_speech(text: str, output_file: str = "output.wav"):
-    if TTS_AVAILABLE:
+_tts_model = None
+
+def load_tts_model():
+    """Load the Coqui model once per process and reuse it"""
+    global _tts_model
+    if _tts_model is None:
         print("Loading Coqui TTS model...")
+        # Use a simpler, more reliable model
+        _tts_model = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC")
+    return _tts_model
+
+def text_to_speech_buffer(text: str) -> AudioBuffer:
+    """Synthesize into memory; encode with .encode() once at the edge"""
+    if TTS_AVAILABLE:
         try:
-            # Use a simpler, more reliable model
-            tts = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC")
-            wav = tts.tts(text)
-            sf.write(output_file, wav, 22050)
-            return output_file
+            tts = load_tts_model()
+            # Tacotron's decoder RNN gains nothing from bf16; inference_mode only
+            with inference_context(autocast=False):
+                wav = tts.tts(text)
+            return AudioBuffer.from_samples(wav, 22050)
         except Exception as e:
             print(f"Coqui TTS failed: {e}. Using gTTS fallback.")
     
-    # gTTS fallback
+    # gTTS fallback: keep its mp3 as-is rather than decoding and re-encoding
+    from gtts import gTTS
     print("Using gTTS fallback...")
     tts = gTTS(text=text, lang='en', slow=False)
-    mp3_file = output_file.replace('.wav', '.mp3')
-    tts.save(mp3_file)
-    return mp3_file
+    mp3 = BytesIO()
+    tts.write_to_fp(mp3)
+    return AudioBuffer.from_encoded(mp3.getvalue(), "mp3")
+
+def text_to_speech(text: str, output_file: str = "output.wav"):
+    audio = text_to_speech_buffer(text)
+    if audio.format == "mp3":
+        output_file = output_file.replace('.wav', '.mp3')
+    with open(output_file, "wb") as f:
+        f.write(audio.encode())
+    return output_file
@@ -0,0 +1,331 @@
+# worker_server.py
+import argparse
+import gc
+import itertools
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+# Models loaded in the parent before forking; workers inherit these pages
+# copy-on-write instead of loading their own copies.
+_MODELS = {}
+
+
+def rss_breakdown(pid="self"):
+    """Memory of a process in kB from /proc/<pid>/smaps_rollup (Linux only).
+
+    `private` is the incremental RSS: what this process holds on its own,
+    as opposed to pages still shared with the parent.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    fields = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+            fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _freeze(module):
+    module.eval()
+    for param in module.parameters():
+        param.requires_grad_(False)
+
+
+def preload_models(stages=("asr", "mt", "tts")):
+    """Load and freeze the models for `stages` in this (parent) process"""
+    if "asr" in stages:
+        import asr_whisper
+        # Workers must look the model up under the same (name, device) key
+        asr_whisper.WHISPER_DEVICE = "cpu"
+        _MODELS["asr"] = asr_whisper.load_whisper_model("tiny", device="cpu")
+        _freeze(_MODELS["asr"])
+    if "mt" in stages:
+        from translate_nllb import NLLBTranslator
+        _MODELS["mt"] = NLLBTranslator()
+        _freeze(_MODELS["mt"].model)
+    if "llm" in stages:
+        import llm_tinyllama  # loads at import time
+        _MODELS["llm"] = llm_tinyllama
+        _freeze(llm_tinyllama.model)
+    if "tts" in stages:
+        import tts_coqui
+        if tts_coqui.TTS_AVAILABLE:
+            _MODELS["tts"] = tts_coqui.load_tts_model()
+
+    # Move everything loaded so far out of the collector's reach: a full
+    # collection in a worker would otherwise touch (and un-share) every
+    # object header in the parent's heap.
+    gc.collect()
+    gc.freeze()
+
+
+def _handle_asr(audio_path=None, audio_bytes=None):
+    from asr_whisper import speech_to_text
+    if audio_bytes is not None:
+        # Uploaded audio, decoded in memory as the apps do
+        from audio_buffer import AudioBuffer
+        return speech_to_text(AudioBuffer.from_bytes(audio_bytes))
+    return speech_to_text(audio_path)
+
+
+def _handle_asr_batch(audio_paths, batch_size=16):
+    from asr_whisper import speech_to_text_batch
+    return speech_to_text_batch(audio_paths, batch_size)
+
+
+def _handle_translate(text, target_lang="fra_Latn"):
+    return _MODELS["mt"].translate(text, target_lang)
+
+
+def _handle_refine(text, target_lang="fra_Latn"):
+    return _MODELS["llm"].refine_text(text, target_lang)
+
+
+def _handle_tts(text, output_file=None):
+    """Write `output_file`, or without one return (encoded bytes, format)"""
+    from tts_coqui import text_to_speech, text_to_speech_buffer
+    if output_file is None:
+        audio = text_to_speech_buffer(text)
+        return audio.encode(), audio.format
+    return text_to_speech(text, output_file)
+
+
+_HANDLERS = {
+    "asr": _handle_asr,
+    "asr_batch": _handle_asr_batch,
+    "translate": _handle_translate,
+    "refine": _handle_refine,
+    "tts": _handle_tts,
+}
+
+
+def _mock_handlers(delays):
+    """Synthetic handlers for exercising dispatch and IPC without models"""
+    def mock(op, result):
+        def handle(**kwargs):
+            time.sleep(delays.get(op, 0.0))
+            return result(**kwargs)
+        return handle
+
+    return {
+        "asr": mock("asr", lambda audio_path=None, audio_bytes=None: "hello world"),
+        "asr_batch": mock("asr_batch", lambda audio_paths, batch_size=16: ["hello world"] * len(audio_paths)),
+        "translate": mock("translate", lambda text, target_lang="fra_Latn": f"[{target_lang}] {text}"),
+        "refine": mock("refine", lambda text, target_lang="fra_Latn": text),
+        "tts": mock("tts", lambda text, output_file=None: output_file or (b"", "wav")),
+    }
+
+
+def _worker_main(requests, responses, current, threads, mock_delays):
+    if mock_delays is not None:
+        handlers = _mock_handlers(mock_delays)
+    else:
+        import torch
+        from inference_opt import warmup
+        torch.set_num_threads(threads)
+        # Compiled graphs are built per worker: compiling in the parent would
+        # mean running inference before fork.
+        warmup(_MODELS.get("mt"), _MODELS.get("asr"))
+        handlers = _HANDLERS
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        request_id, op, kwargs = job
+        # Shared memory rather than a queue message: visible to the parent
+        # even if this process dies before its queue is flushed.
+        current.value = request_id
+        try:
+            responses.put((request_id, True, handlers[op](**kwargs)))
+        except Exception as e:
+            responses.put((request_id, False, f"{type(e).__name__}: {e}"))
+        current.value = -1
+
+
+class InferenceServer:
+    """Parent process that preloads models and forks N inference workers.
+
+    Requests go to whichever worker is free through a shared request queue;
+    results come back through a response queue and resolve the Future
+    returned by `submit`. Requires the fork start method (Linux/macOS).
+
+    The parent must not run inference itself before `start()`: forking
+    after torch has spun up its thread pools can deadlock the children.
+    A worker that dies fails the request it was running, and once no
+    worker is left every pending request fails instead of hanging.
+
+    With `mock_delays` ({op: seconds}) nothing is preloaded and the workers
+    sleep instead of running models, so the dispatch and IPC path can be
+    load-tested without checkpoints.
+    """
+
+    def __init__(self, workers=2, stages=("asr", "mt", "tts"), threads_per_worker=None,
+                 mock_delays=None):
+        if "fork" not in mp.get_all_start_methods():
+            raise RuntimeError("Preload-then-fork needs the 'fork' start method (not available on Windows)")
+        self.workers = workers
+        self.stages = stages
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.mock_delays = mock_delays
+        self.ctx = mp.get_context("fork")
+        self.processes = []
+        self.baseline = None
+        self._pending = {}
+        self._current = []  # per worker: shared id of the request it is running
+        self._dead = set()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.mock_delays is None:
+            print(f"Preloading models for stages: {', '.join(self.stages)}")
+            preload_models(self.stages)
+        self.baseline = rss_breakdown()
+
+        self.requests = self.ctx.Queue()
+        self.responses = self.ctx.Queue()
+        for _ in range(self.workers):
+            current = self.ctx.Value("q", -1, lock=False)
+            proc = self.ctx.Process(
+                target=_worker_main,
+                args=(self.requests, self.responses, current, self.threads_per_worker, self.mock_delays),
+                daemon=True,
+            )
+            proc.start()
+            self.processes.append(proc)
+            self._current.append(current)
+        print(f"Forked {self.workers} workers ({self.threads_per_worker} threads each)")
+
+        self._stopping = threading.Event()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch_workers, daemon=True)
+        self._monitor.start()
+        return self
+
+    def _collect(self):
+        while True:
+            item = self.responses.get()
+            if item is None:
+                break
+            request_id, ok, value = item
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _fail(self, request_id, reason):
+        with self._lock:
+            future = self._pending.pop(request_id, None)
+        if future is not None:
+            future.set_exception(RuntimeError(reason))
+
+    def _watch_workers(self):
+        while not self._stopping.wait(1.0):
+            for proc, current in zip(self.processes, self._current):
+                if proc.is_alive() or proc.pid in self._dead:
+                    continue
+                self._dead.add(proc.pid)
+                request_id = current.value
+                print(f"Worker {proc.pid} exited with code {proc.exitcode}")
+                if request_id >= 0:
+                    self._fail(request_id, f"worker {proc.pid} died (exit code {proc.exitcode})")
+            if self.processes and len(self._dead) == len(self.processes):
+                with self._lock:
+                    pending = list(self._pending)
+                for request_id in pending:
+                    self._fail(request_id, "no inference workers left")
+
+    def submit(self, op, **kwargs):
+        if op not in _HANDLERS:
+            raise ValueError(f"Unknown op: {op}")
+        if self.processes and len(self._dead) == len(self.processes):
+            raise RuntimeError("No inference workers left")
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = future
+        self.requests.put((request_id, op, kwargs))
+        return future
+
+    def call(self, op, timeout=None, **kwargs):
+        return self.submit(op, **kwargs).result(timeout=timeout)
+
+    def memory_report(self):
+        """Parent and per-worker memory in kB; `private` is incremental RSS"""
+        report = [{"name": "parent", "pid": os.getpid(), **(rss_breakdown() or {})}]
+        for i, proc in enumerate(self.processes):
+            report.append({"name": f"worker-{i}", "pid": proc.pid, **(rss_breakdown(proc.pid) or {})})
+        return report
+
+    def print_memory_report(self):
+        report = self.memory_report()
+        if "rss" not in report[0]:
+            print("Memory report needs /proc/<pid>/smaps_rollup (Linux)")
+            return
+        print(f"{'process':<10} {'pid':>7} {'RSS MB':>9} {'PSS MB':>9} {'shared MB':>10} {'private MB':>11}")
+        for row in report:
+            print(f"{row['name']:<10} {row['pid']:>7} {row['rss'] / 1024:>9.1f} {row['pss'] / 1024:>9.1f} "
+                  f"{row['shared'] / 1024:>10.1f} {row['private'] / 1024:>11.1f}")
+        workers = report[1:]
+        if workers:
+            incremental = sum(row["private"] for row in workers) / len(workers) / 1024
+            print(f"Per-worker incremental RSS: {incremental:.1f} MB "
+                  f"(vs {report[0]['rss'] / 1024:.1f} MB for a separately loaded process)")
+
+    def stop(self):
+        self._stopping.set()
+        self._monitor.join(timeout=10)
+        for _ in self.processes:
+            self.requests.put(None)
+        for proc in self.processes:
+            proc.join(timeout=10)
+        self.responses.put(None)
+        # Wait for the collector: left running, it can still be reading the
+        # queue while the interpreter tears the module down.
+        self._collector.join(timeout=10)
+        self.processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preload models once, then fork inference workers")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--stages", default="asr,mt,tts", help="Comma-separated: asr,mt,llm,tts")
+    parser.add_argument("--audio", help="Optional audio file to run through ASR → MT on every worker")
+    parser.add_argument("--target-lang", default="fra_Latn")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        sys.exit("worker_server needs fork; run it on Linux or macOS")
+
+    with InferenceServer(workers=args.workers, stages=args.stages.split(",")) as server:
+        if args.audio:
+            texts = [server.submit("asr", audio_path=args.audio) for _ in range(args.workers)]
+            for future in texts:
+                text = future.result()
+                print(f"Recognized Text: {text}")
+                print(f"Translated Text: {server.call('translate', text=text, target_lang=args.target_lang)}")
+        server.print_memory_report()